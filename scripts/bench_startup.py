@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Track CLI start-up cost with `python -X importtime`.
+
+Each target is imported in a fresh interpreter several times; the report lists
+the median cumulative import time per script and its heaviest imports. With
+`--baseline` the run fails when a script got slower than the allowed ratio, so
+an eager `import boto3` or `import requests` sneaking back in is caught.
+
+    python scripts/bench_startup.py --write-baseline /tmp/startup.json
+    python scripts/bench_startup.py --baseline /tmp/startup.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+TARGETS = ("ingest", "cleanup_deleted", "refresh_metrics", "reencode", "verify_media")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, depth, cumulative µs) for every line of `-X importtime` output."""
+    entries: list[tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append((match.group(4), len(match.group(3)) // 2, int(match.group(2))))
+    return entries
+
+
+def measure(target: str) -> tuple[int, dict[str, int]]:
+    """Cumulative import time of `target` and of each module it imports directly.
+
+    Children are printed before their parent, so the target's own imports are
+    the depth-1 lines right above it; interpreter start-up (site, .pth hooks)
+    sits before that block and is left out.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{result.stderr[-2000:]}")
+    entries = parse_importtime(result.stderr)
+    position = max(index for index, (module, depth, _) in enumerate(entries) if module == target and depth == 0)
+    children: dict[str, int] = {}
+    for module, depth, cumulative in reversed(entries[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children[module] = cumulative
+    return entries[position][2], children
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure CLI import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest imports listed per script")
+    parser.add_argument("--baseline", type=Path, help="Fail when slower than this earlier report")
+    parser.add_argument("--max-ratio", type=float, default=1.5, help="Allowed slowdown against the baseline")
+    parser.add_argument("--write-baseline", type=Path, help="Save this run's report as JSON")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    # 先导入一次，让 .pyc 就位，第一轮不把编译时间算进去。
+    for target in TARGETS:
+        measure(target)
+
+    report: dict[str, dict] = {}
+    for target in TARGETS:
+        totals: list[int] = []
+        heaviest: dict[str, int] = {}
+        for _ in range(args.runs):
+            total, children = measure(target)
+            totals.append(total)
+            for module, cumulative in children.items():
+                heaviest[module] = max(heaviest.get(module, 0), cumulative)
+        report[target] = {
+            "median_ms": round(statistics.median(totals) / 1000, 1),
+            "heaviest_ms": {
+                module: round(cumulative / 1000, 1)
+                for module, cumulative in sorted(heaviest.items(), key=lambda item: item[1], reverse=True)[: args.top]
+            },
+        }
+        heaviest_text = ", ".join(f"{module} {ms}ms" for module, ms in report[target]["heaviest_ms"].items())
+        print(f"{target}: {report[target]['median_ms']}ms ({heaviest_text})")
+
+    if args.write_baseline:
+        args.write_baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {args.write_baseline}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        slower = [
+            f"{target} {report[target]['median_ms']}ms vs {baseline[target]['median_ms']}ms"
+            for target in TARGETS
+            if target in baseline
+            and report[target]["median_ms"] > max(baseline[target]["median_ms"], 1.0) * args.max_ratio
+        ]
+        if slower:
+            print("start-up regressed: " + "; ".join(slower), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
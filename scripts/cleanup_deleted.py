@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
-"""Delete expired soft-deleted artwork media from R2 and remove its metadata file."""
+"""Delete expired soft-deleted artwork media from storage and remove its metadata file."""
 
 from __future__ import annotations
 
 import argparse
 import json
-import os
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from storage import open_storage
+
 ROOT = Path(__file__).resolve().parents[1]
 CONTENT_DIR = ROOT / "src" / "content" / "artworks"
 
@@ -43,14 +44,19 @@ def expired_artworks(retention_days: int) -> list[tuple[Path, dict]]:
 
 
 def media_keys(artwork: dict) -> list[str]:
-    """Every R2 object an artwork owns: the archived source plus each variant.
+    """Every R2 object an artwork owns: the archived source, each variant and crop.
 
     Missing the source here would leave the largest object of all behind as an
     orphan that nothing references and nothing will ever clean up.
     """
     keys: list[str] = []
     for media in artwork.get("media", []):
-        entries = [media.get("source"), *media.get("variants", [])]
+        crops = [crop for crop in media.get("crops", []) if isinstance(crop, dict)]
+        entries = [
+            media.get("source"),
+            *media.get("variants", []),
+            *(variant for crop in crops for variant in crop.get("variants", [])),
+        ]
         for entry in entries:
             if not isinstance(entry, dict):
                 continue
@@ -60,27 +66,6 @@ def media_keys(artwork: dict) -> list[str]:
     return keys
 
 
-def r2_client():
-    import boto3
-    from botocore.config import Config
-
-    account_id = os.environ.get("CLOUDFLARE_ACCOUNT_ID")
-    access_key = os.environ.get("R2_ACCESS_KEY_ID")
-    secret_key = os.environ.get("R2_SECRET_ACCESS_KEY")
-    if not account_id or not access_key or not secret_key:
-        raise RuntimeError(
-            "CLOUDFLARE_ACCOUNT_ID, R2_ACCESS_KEY_ID, and R2_SECRET_ACCESS_KEY are required"
-        )
-    return boto3.client(
-        "s3",
-        endpoint_url=f"https://{account_id}.r2.cloudflarestorage.com",
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        region_name="auto",
-        config=Config(signature_version="s3v4", retries={"max_attempts": 4, "mode": "standard"}),
-    )
-
-
 def main() -> int:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--retention-days", type=int, default=30)
@@ -94,20 +79,17 @@ def main() -> int:
         print("no expired soft-deleted artworks")
         return 0
 
-    bucket = os.environ.get("R2_BUCKET", "sesese-se-media")
-    client = None if args.dry_run else r2_client()
+    storage = None if args.dry_run else open_storage()
     for path, artwork in expired:
         keys = media_keys(artwork)
         print(f"{'would clean' if args.dry_run else 'cleaning'} {artwork.get('id', path.stem)}: {len(keys)} objects")
         if args.dry_run:
             continue
         if keys:
-            result = client.delete_objects(
-                Bucket=bucket,
-                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
-            )
-            if result.get("Errors"):
-                raise RuntimeError(f"R2 failed to delete objects for {artwork.get('id', path.stem)}: {result['Errors']}")
+            try:
+                storage.delete_objects(keys)
+            except RuntimeError as error:
+                raise RuntimeError(f"failed to delete objects for {artwork.get('id', path.stem)}: {error}") from error
         path.unlink()
         print(f"removed {path.relative_to(ROOT)}")
     return 0
@@ -16,7 +16,11 @@ import io
 import json
 import os
 import re
+import shutil
+import subprocess
 import sys
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
@@ -24,8 +28,9 @@ from tempfile import TemporaryDirectory
 from typing import Iterable
 from urllib.parse import urlparse
 
-import requests
 from ingest_contract import (
+    crop_aspect,
+    crop_dimensions,
     normalize_author_name,
     parse_csv,
     parse_x_status,
@@ -34,12 +39,21 @@ from ingest_contract import (
     target_dimensions,
     x_title,
 )
+from storage import Storage, open_storage
 
 ROOT = Path(__file__).resolve().parents[1]
 CONTENT_DIR = ROOT / "src" / "content" / "artworks"
 SEQUENCE_REGISTRY_PATH = ROOT / "src" / "content" / "artwork-sequences.json"
 MAX_DOWNLOAD_BYTES = 100 * 1024 * 1024
 
+# 来源与存储的地址平时不用改；本地压测（scripts/ingest_harness.py）把它们指向桩服务。
+X_API_ORIGIN = os.environ.get("X_API_ORIGIN", "https://api.x.com").rstrip("/")
+FXTWITTER_API_ORIGIN = os.environ.get("FXTWITTER_API_ORIGIN", "https://api.fxtwitter.com").rstrip("/")
+PIXIV_API_ORIGIN = os.environ.get("PIXIV_API_ORIGIN", "").rstrip("/")
+
+# 序号登记和重复检测都是「读全部 JSON → 改 → 写回」，同一进程里并发采集时必须串行。
+METADATA_LOCK = threading.Lock()
+
 
 @dataclass
 class RemoteImage:
@@ -69,8 +83,10 @@ class FetchedArtwork:
 
 
 def fetch_x_official(status_id: str, status_url: str, token: str) -> FetchedArtwork:
+    import requests
+
     response = requests.get(
-        f"https://api.x.com/2/tweets/{status_id}",
+        f"{X_API_ORIGIN}/2/tweets/{status_id}",
         headers={"Authorization": f"Bearer {token}", "User-Agent": "sesese-se-ingest/2.0"},
         params={
             "tweet.fields": "created_at,entities,public_metrics,attachments",
@@ -113,8 +129,10 @@ def fetch_x_official(status_id: str, status_url: str, token: str) -> FetchedArtw
 
 def fetch_x_free(status_id: str, status_url: str) -> FetchedArtwork:
     """Best-effort free X lookup through the open-source FxTwitter service."""
+    import requests
+
     response = requests.get(
-        f"https://api.fxtwitter.com/status/{status_id}",
+        f"{FXTWITTER_API_ORIGIN}/status/{status_id}",
         headers={"User-Agent": "sesese-se-ingest/2.0 (+https://sesese.se)"},
         timeout=(15, 45),
     )
@@ -163,15 +181,35 @@ def fetch_x(value: str, source_url: str = "") -> FetchedArtwork:
     return fetch_x_free(status_id, status_url)
 
 
-def fetch_pixiv(artwork_id: str) -> FetchedArtwork:
+# Pixiv 的 access token 一小时过期；常驻模式下复用同一个客户端，提前十分钟重新换取。
+PIXIV_TOKEN_REUSE_SECONDS = 50 * 60
+_pixiv_client: tuple[float, object] | None = None
+# 并发采集时只让一个线程去换 token，其余线程等它换完直接复用。
+PIXIV_CLIENT_LOCK = threading.Lock()
+
+
+def pixiv_api():
+    """An authenticated Pixiv app API client, reused while its token is fresh."""
+    global _pixiv_client
     from pixivpy3 import AppPixivAPI
 
-    refresh_token = os.environ.get("PIXIV_REFRESH_TOKEN")
-    if not refresh_token:
-        raise RuntimeError("PIXIV_REFRESH_TOKEN is required for Pixiv ingestion")
+    with PIXIV_CLIENT_LOCK:
+        if _pixiv_client and time.monotonic() - _pixiv_client[0] < PIXIV_TOKEN_REUSE_SECONDS:
+            return _pixiv_client[1]
+        refresh_token = os.environ.get("PIXIV_REFRESH_TOKEN")
+        if not refresh_token:
+            raise RuntimeError("PIXIV_REFRESH_TOKEN is required for Pixiv ingestion")
+
+        api = AppPixivAPI()
+        if PIXIV_API_ORIGIN:
+            api.set_api_proxy(PIXIV_API_ORIGIN)
+        api.auth(refresh_token=refresh_token)
+        _pixiv_client = (time.monotonic(), api)
+        return api
 
-    api = AppPixivAPI()
-    api.auth(refresh_token=refresh_token)
+
+def fetch_pixiv(artwork_id: str) -> FetchedArtwork:
+    api = pixiv_api()
     result = api.illust_detail(int(artwork_id))
     if "illust" not in result:
         message = result.get("error", {}).get("message", "Unknown Pixiv API error")
@@ -237,6 +275,8 @@ def fetch_direct(args: argparse.Namespace) -> FetchedArtwork:
 
 
 def download_image(remote: RemoteImage) -> bytes:
+    import requests
+
     headers = {
         "User-Agent": "sesese-se-ingest/2.0 (+https://sesese.se)",
         **remote.headers,
@@ -256,65 +296,125 @@ def download_image(remote: RemoteImage) -> bytes:
         return b"".join(chunks)
 
 
-class R2Storage:
-    def __init__(self, force: bool = False):
-        import boto3
-        from botocore.config import Config
-
-        account_id = os.environ.get("CLOUDFLARE_ACCOUNT_ID")
-        access_key = os.environ.get("R2_ACCESS_KEY_ID")
-        secret_key = os.environ.get("R2_SECRET_ACCESS_KEY")
-        self.bucket = os.environ.get("R2_BUCKET", "sesese-se-media")
-        if not account_id or not access_key or not secret_key:
-            raise RuntimeError(
-                "CLOUDFLARE_ACCOUNT_ID, R2_ACCESS_KEY_ID, and R2_SECRET_ACCESS_KEY are required"
-            )
-        self.client = boto3.client(
-            "s3",
-            endpoint_url=f"https://{account_id}.r2.cloudflarestorage.com",
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name="auto",
-            config=Config(signature_version="s3v4", retries={"max_attempts": 4, "mode": "standard"}),
-        )
-        self.force = force
-
-    def exists(self, key: str) -> bool:
-        from botocore.exceptions import ClientError
-
-        try:
-            self.client.head_object(Bucket=self.bucket, Key=key)
-            return True
-        except ClientError as error:
-            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
-            if status == 404:
-                return False
-            raise
-
-    def put_object(self, key: str, payload: bytes, content_type: str) -> None:
-        if not self.force and self.exists(key):
-            print(f"skip existing r2://{self.bucket}/{key}")
-            return
-        self.client.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=payload,
-            ContentType=content_type,
-            CacheControl="public, max-age=31536000, immutable",
-        )
-        print(f"uploaded r2://{self.bucket}/{key} ({len(payload)} bytes)")
-
-
 # 展示格式。AVIF 排在前面，浏览器按 <source> 顺序取第一个支持的。
 # 质量档位是实测选的：以现有 WebP q88 为基准，AVIF q75 体积小约 15%，
 # PSNR 仍在 43dB 以上，正常观看距离下看不出差别。原图既然已经留存，
 # 展示端就没有必要为「将来可能要放大」再留余量。
+# 最后一列是编码档版本，写进每个变体的 profile。改了参数就把版本加一，
+# scripts/reencode.py 会从存档原图只重做版本过期的变体。
 DISPLAY_ENCODINGS = (
-    ("avif", "AVIF", "image/avif", {"quality": 75, "speed": 4}),
-    ("webp", "WEBP", "image/webp", {"quality": 88, "method": 6, "optimize": True}),
+    ("avif", "AVIF", "image/avif", {"quality": 75, "speed": 4}, 1),
+    ("webp", "WEBP", "image/webp", {"quality": 88, "method": 6, "optimize": True}, 1),
 )
 
 
+def encoder_profile(fmt: str) -> str | None:
+    """The current profile tag for a display format, or None if it is no longer produced."""
+    return next((f"{fmt}-v{version}" for name, _, _, _, version in DISPLAY_ENCODINGS if name == fmt), None)
+
+
+def media_prefix(source_type: str, source_id: str, page: int) -> str:
+    return f"media/{source_type}/{safe_identifier(source_id)}/{page}"
+
+
+def variant_plan(prefix: str, width: int, height: int) -> list[dict]:
+    """Every display variant the current widths and encoder profiles call for."""
+    plan: list[dict] = []
+    dimensions = target_dimensions(width, height)
+    for index, (variant_width, variant_height) in enumerate(dimensions):
+        stem = "original" if index == len(dimensions) - 1 else f"{variant_width}w"
+        for fmt, *_ in DISPLAY_ENCODINGS:
+            plan.append({
+                "key": f"{prefix}/{stem}.{fmt}",
+                "format": fmt,
+                "width": variant_width,
+                "height": variant_height,
+                "profile": encoder_profile(fmt),
+            })
+    return plan
+
+
+def crop_plan(prefix: str, aspect: tuple[int, int], crop_width: int) -> list[dict]:
+    """The thumbnail variants of one fixed-aspect crop."""
+    aspect_width, aspect_height = aspect
+    plan: list[dict] = []
+    for variant_width, variant_height in crop_dimensions(crop_width, aspect):
+        for fmt, *_ in DISPLAY_ENCODINGS:
+            plan.append({
+                "key": f"{prefix}/crop-{aspect_width}x{aspect_height}-{variant_width}w.{fmt}",
+                "format": fmt,
+                "width": variant_width,
+                "height": variant_height,
+                "profile": encoder_profile(fmt),
+            })
+    return plan
+
+
+def display_image(opened):
+    """The upright RGB image every display variant is derived from."""
+    from PIL import ImageOps
+
+    return ImageOps.exif_transpose(opened).convert("RGB")
+
+
+def encode_planned(image, planned: list[dict]) -> tuple[list[dict], list[tuple[str, bytes, str]]]:
+    """Encode plan entries from the display image, resizing once per size."""
+    from PIL import Image
+
+    encodings = {fmt: (pillow_format, mime, options) for fmt, pillow_format, mime, options, _ in DISPLAY_ENCODINGS}
+    variants: list[dict] = []
+    uploads: list[tuple[str, bytes, str]] = []
+    resized, resized_size = image, image.size
+    for entry in planned:
+        size = (entry["width"], entry["height"])
+        if size != resized_size:
+            resized = image if size == image.size else image.resize(size, Image.Resampling.LANCZOS)
+            resized_size = size
+        pillow_format, mime, options = encodings[entry["format"]]
+        output = io.BytesIO()
+        resized.save(output, format=pillow_format, **options)
+        payload = output.getvalue()
+        variants.append({
+            "key": entry["key"],
+            "format": entry["format"],
+            "width": entry["width"],
+            "height": entry["height"],
+            "bytes": len(payload),
+            "profile": entry["profile"],
+        })
+        uploads.append((entry["key"], payload, mime))
+    return variants, uploads
+
+
+def encode_crops(image, prefix: str, frame: tuple[int, int]) -> tuple[list[dict], list[tuple[str, bytes, str]]]:
+    """The saliency-framed list thumbnail of the display image, if its shape needs one.
+
+    Only images the list page would otherwise show as a sliver or a stamp get a
+    crop (see crop_aspect). The box is recorded in the `frame` coordinates, the
+    media's own width and height, so it lines up with the full-frame variants.
+    """
+    aspect = crop_aspect(*frame)
+    if aspect is None:
+        return [], []
+    from smart_crop import crop_boxes
+
+    scale_x, scale_y = frame[0] / image.width, frame[1] / image.height
+    # 显著度只在 256px 的小图上算，几毫秒；真正的开销是裁切的编码。
+    (left, top, right, bottom), = crop_boxes(image, [aspect])
+    variants, uploads = encode_planned(image.crop((left, top, right, bottom)), crop_plan(prefix, aspect, right - left))
+    crop = {
+        "aspect": f"{aspect[0]}:{aspect[1]}",
+        "box": {
+            "x": round(left * scale_x),
+            "y": round(top * scale_y),
+            "width": min(frame[0], round((right - left) * scale_x)),
+            "height": min(frame[1], round((bottom - top) * scale_y)),
+        },
+        "variants": variants,
+    }
+    return [crop], uploads
+
+
 @dataclass
 class EncodedMedia:
     width: int
@@ -322,55 +422,162 @@ class EncodedMedia:
     content_hash: str
     source: dict
     variants: list[dict]
+    crops: list[dict]
     uploads: list[tuple[str, bytes, str]]
 
 
-def encode_variants(raw: bytes, source_type: str, source_id: str, page: int) -> EncodedMedia:
+# 决定显示颜色的色彩块。Pillow 的 PNG 写入器只会写 iCCP，gAMA、cHRM、sRGB、sBIT
+# 都会丢，所以一律从原图按字节搬过去；规范要求它们位于 PLTE 和 IDAT 之前。
+PNG_COLOR_CHUNKS = (b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT")
+
+
+def png_chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    """(type, raw chunk bytes including length and CRC) for each chunk of a PNG."""
+    chunks: list[tuple[bytes, bytes]] = []
+    offset = 8
+    while offset + 12 <= len(data):
+        length = int.from_bytes(data[offset:offset + 4], "big")
+        kind = data[offset + 4:offset + 8]
+        chunks.append((kind, data[offset:offset + 12 + length]))
+        offset += 12 + length
+        if kind == b"IEND":
+            break
+    return chunks
+
+
+def png_header(data: bytes) -> tuple[int, int]:
+    """IHDR bit depth and colour type."""
+    return data[24], data[25]
+
+
+def with_png_color_chunks(candidate: bytes, original: bytes) -> bytes:
+    """`candidate` with its colour chunks replaced by the original's, right after IHDR."""
+    carried = [chunk for kind, chunk in png_chunks(original) if kind in PNG_COLOR_CHUNKS]
+    chunks = [(kind, chunk) for kind, chunk in png_chunks(candidate) if kind not in PNG_COLOR_CHUNKS]
+    return candidate[:8] + chunks[0][1] + b"".join(carried) + b"".join(chunk for _, chunk in chunks[1:])
+
+
+def same_pixels(first, second) -> bool:
+    """True when two decoded images carry identical pixels.
+
+    Palette images are compared after expansion, because an optimizing PNG
+    writer is free to reorder or shrink the palette.
+    """
+    if first.size != second.size:
+        return False
+    if first.mode == "P" and second.mode == "P":
+        return first.convert("RGBA").tobytes() == second.convert("RGBA").tobytes()
+    return first.mode == second.mode and first.tobytes() == second.tobytes()
+
+
+def repack_candidates(raw: bytes, opened) -> Iterable[bytes]:
+    """Smaller encodings of the archived original that may be pixel-identical."""
+    if opened.format == "JPEG":
+        # 只用 jpegtran：它只重排哈夫曼表和扫描顺序，不碰 DCT 系数，是真正的无损。
+        # Pillow 只能解码后重新量化，几乎过不了逐像素校验，白白多一轮编解码，没装就保留原样。
+        jpegtran = shutil.which("jpegtran")
+        if jpegtran:
+            result = subprocess.run(
+                [jpegtran, "-copy", "all", "-optimize", "-progressive"],
+                input=raw,
+                capture_output=True,
+                check=False,
+            )
+            if result.returncode == 0 and result.stdout:
+                yield result.stdout
+    elif opened.format == "PNG":
+        # Pillow 把 16 位通道读成 8 位，重存也是 8 位；两边解码都已截断，逐像素校验发现不了。
+        if png_header(raw)[0] > 8:
+            return
+        from PIL import PngImagePlugin
+
+        text = PngImagePlugin.PngInfo()
+        for key, value in getattr(opened, "text", {}).items():
+            text.add_itxt(key, value)
+        options = {key: opened.info[key] for key in ("dpi", "transparency", "exif") if key in opened.info}
+        output = io.BytesIO()
+        opened.save(output, format="PNG", optimize=True, compress_level=9, pnginfo=text, **options)
+        yield with_png_color_chunks(output.getvalue(), raw)
+
+
+def optimize_source(raw: bytes, opened) -> bytes | None:
+    """Return a smaller, pixel-identical re-pack of `raw`, or None to keep it as is.
+
+    Every candidate is decoded and compared pixel by pixel against the original
+    before it may replace it; a PNG must also keep its bit depth, colour type
+    and colour chunks. Animated files are never touched.
+    """
+    from PIL import Image
+
+    if getattr(opened, "is_animated", False):
+        return None
+    opened.load()
+    for candidate in repack_candidates(raw, opened):
+        if len(candidate) >= len(raw):
+            continue
+        if opened.format == "PNG" and (
+            png_header(candidate) != png_header(raw)
+            or [chunk for kind, chunk in png_chunks(candidate) if kind in PNG_COLOR_CHUNKS]
+            != [chunk for kind, chunk in png_chunks(raw) if kind in PNG_COLOR_CHUNKS]
+        ):
+            continue
+        try:
+            with Image.open(io.BytesIO(candidate)) as repacked:
+                repacked.load()
+                if repacked.format == opened.format and same_pixels(opened, repacked):
+                    return candidate
+        except OSError:
+            continue
+    return None
+
+
+def encode_variants(
+    raw: bytes,
+    source_type: str,
+    source_id: str,
+    page: int,
+    optimize_archive: bool = False,
+) -> EncodedMedia:
     """Archive the untouched download and derive the display variants from it.
 
     The bytes we upload as `source.*` are exactly what the provider served, so a
-    future re-encode never has to start from one of our own lossy variants.
+    future re-encode never has to start from one of our own lossy variants. With
+    `optimize_archive` a smaller lossless re-pack may be archived instead, but
+    only after it has been shown to decode to the same pixels.
     """
-    from PIL import Image, ImageOps
+    from PIL import Image
 
     content_hash = f"sha256:{hashlib.sha256(raw).hexdigest()}"
-    prefix = f"media/{source_type}/{safe_identifier(source_id)}/{page}"
+    prefix = media_prefix(source_type, source_id, page)
     with Image.open(io.BytesIO(raw)) as opened:
         extension, content_type = source_descriptor(opened.format)
         source_width, source_height = opened.size
-        image = ImageOps.exif_transpose(opened).convert("RGB")
+        archived = optimize_source(raw, opened) if optimize_archive else None
+        image = display_image(opened)
 
         source_key = f"{prefix}/source.{extension}"
-        uploads: list[tuple[str, bytes, str]] = [(source_key, raw, content_type)]
+        uploads: list[tuple[str, bytes, str]] = [(source_key, archived or raw, content_type)]
         source = {
             "key": source_key,
             "format": extension,
             "width": source_width,
             "height": source_height,
-            "bytes": len(raw),
+            "bytes": len(archived or raw),
         }
+        if archived:
+            # content_hash 仍指下载到的原始字节，查重靠它；存档对象换了字节，另记一份自己的哈希。
+            source["original_bytes"] = len(raw)
+            source["content_hash"] = f"sha256:{hashlib.sha256(archived).hexdigest()}"
+            print(f"re-packed source {source_key}: {len(raw)} -> {len(archived)} bytes, pixels verified")
 
-        variants: list[dict] = []
-        dimensions = target_dimensions(*image.size)
-        for index, (width, height) in enumerate(dimensions):
-            resized = image if (width, height) == image.size else image.resize((width, height), Image.Resampling.LANCZOS)
-            stem = "original" if index == len(dimensions) - 1 else f"{width}w"
-            for fmt, pillow_format, mime, options in DISPLAY_ENCODINGS:
-                output = io.BytesIO()
-                resized.save(output, format=pillow_format, **options)
-                payload = output.getvalue()
-                key = f"{prefix}/{stem}.{fmt}"
-                variants.append({
-                    "key": key,
-                    "format": fmt,
-                    "width": width,
-                    "height": height,
-                    "bytes": len(payload),
-                })
-                uploads.append((key, payload, mime))
-
-        display_width, display_height = dimensions[-1]
-        return EncodedMedia(display_width, display_height, content_hash, source, variants, uploads)
+        plan = variant_plan(prefix, *image.size)
+        variants, encoded = encode_planned(image, plan)
+        uploads.extend(encoded)
+
+        display_width, display_height = plan[-1]["width"], plan[-1]["height"]
+        crops, encoded = encode_crops(image, prefix, (display_width, display_height))
+        uploads.extend(encoded)
+        return EncodedMedia(display_width, display_height, content_hash, source, variants, crops, uploads)
 
 
 def existing_metadata(path: Path) -> dict:
@@ -499,8 +706,14 @@ def write_metadata(artwork: FetchedArtwork, media: list[dict], content_hash: str
     return output_path
 
 
-def ingest(artwork: FetchedArtwork, force: bool, allow_duplicate: bool) -> Path:
-    storage = R2Storage(force=force)
+def ingest(
+    artwork: FetchedArtwork,
+    force: bool,
+    allow_duplicate: bool,
+    optimize_archive: bool = False,
+    storage: Storage | None = None,
+) -> Path:
+    storage = storage or open_storage(force=force)
     media: list[dict] = []
     media_hashes: list[str] = []
     with TemporaryDirectory(prefix="sesese-ingest-"):
@@ -508,7 +721,7 @@ def ingest(artwork: FetchedArtwork, force: bool, allow_duplicate: bool) -> Path:
             page = remote.index
             print(f"downloading {artwork.source_type}:{artwork.source_id} source image {page}")
             raw = download_image(remote)
-            encoded = encode_variants(raw, artwork.source_type, artwork.source_id, page)
+            encoded = encode_variants(raw, artwork.source_type, artwork.source_id, page, optimize_archive)
             media_hashes.append(encoded.content_hash.removeprefix("sha256:"))
             for key, payload, content_type in encoded.uploads:
                 storage.put_object(key, payload, content_type)
@@ -520,15 +733,17 @@ def ingest(artwork: FetchedArtwork, force: bool, allow_duplicate: bool) -> Path:
                 "content_hash": encoded.content_hash,
                 "source": encoded.source,
                 "variants": encoded.variants,
+                **({"crops": encoded.crops} if encoded.crops else {}),
             })
     artwork_hash = "sha256:" + hashlib.sha256("\n".join(media_hashes).encode()).hexdigest()
-    return write_metadata(artwork, media, artwork_hash, allow_duplicate)
+    with METADATA_LOCK:
+        return write_metadata(artwork, media, artwork_hash, allow_duplicate)
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Ingest artwork into sesese-se")
-    parser.add_argument("--source", choices=("pixiv", "x", "danbooru", "other"), required=True)
-    parser.add_argument("--id", required=True, help="Provider artwork ID or stable slug")
+    parser.add_argument("--source", choices=("pixiv", "x", "danbooru", "other"))
+    parser.add_argument("--id", help="Provider artwork ID or stable slug")
     parser.add_argument("--display-image", type=int, default=1, help="One-based source image to display")
     parser.add_argument("--source-url", default="")
     parser.add_argument("--image-urls", default="", help="One direct image URL per line")
@@ -542,31 +757,97 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--author-url", default="")
     parser.add_argument("--force", action="store_true", help="Overwrite existing R2 objects")
     parser.add_argument("--allow-duplicate", action="store_true", help="Allow an identical media set under another source")
+    parser.add_argument(
+        "--optimize-source",
+        action="store_true",
+        help="Archive a smaller lossless re-pack of the original when its pixels verify identical",
+    )
+    parser.add_argument(
+        "--resident",
+        action="store_true",
+        help="Read one JSON array of these arguments per stdin line and ingest them in one process",
+    )
     return parser
 
 
-def main() -> int:
-    args = build_parser().parse_args()
+def parse_job(parser: argparse.ArgumentParser, argv: list[str]) -> argparse.Namespace:
     try:
-        if args.source == "pixiv":
-            artwork = fetch_pixiv(args.id)
-        elif args.source == "x":
-            try:
-                artwork = fetch_x(args.id, args.source_url)
-            except Exception:
-                if not args.image_urls:
-                    raise
-                print("automatic X lookup failed; using supplied direct metadata", file=sys.stderr)
-                artwork = fetch_direct(args)
-        else:
+        args = parser.parse_args(argv)
+    except SystemExit:
+        raise ValueError(f"invalid job arguments: {argv}") from None
+    if args.resident or not args.source or not args.id:
+        raise ValueError(f"a job needs --source and --id and cannot nest --resident: {argv}")
+    return args
+
+
+def serve_jobs(parser: argparse.ArgumentParser, lines: Iterable[str]) -> int:
+    """Resident mode: ingest a stream of jobs with one interpreter and one R2 client.
+
+    Interpreter start-up, the storage clients with their service models, the Pixiv
+    token and Pillow's plugin registry are paid once instead of once per artwork.
+    """
+    from PIL import Image
+
+    Image.init()
+    storage: Storage | None = None
+    failed = 0
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            argv = json.loads(line)
+            if not isinstance(argv, list) or not all(isinstance(item, str) for item in argv):
+                raise ValueError("each job must be a JSON array of strings")
+            args = parse_job(parser, argv)
+            storage = storage or open_storage(force=args.force)
+            storage.force = args.force
+            output = run(args, storage=storage)
+            print(f"done: {output}", flush=True)
+        except Exception as error:
+            failed += 1
+            print(f"job {number} failed: {error}", file=sys.stderr, flush=True)
+    print(f"resident worker finished, {failed} failed jobs")
+    return 1 if failed else 0
+
+
+def run(args: argparse.Namespace, storage: Storage | None = None) -> Path:
+    """Fetch, encode, upload, and record one artwork described by CLI arguments."""
+    if args.source == "pixiv":
+        artwork = fetch_pixiv(args.id)
+    elif args.source == "x":
+        try:
+            artwork = fetch_x(args.id, args.source_url)
+        except Exception:
+            if not args.image_urls:
+                raise
+            print("automatic X lookup failed; using supplied direct metadata", file=sys.stderr)
             artwork = fetch_direct(args)
-        selected = next((image for image in artwork.images if image.index == args.display_image), None)
-        if selected is None:
-            available = ", ".join(str(image.index) for image in artwork.images)
-            raise ValueError(f"display image {args.display_image} is unavailable; available pages: {available}")
-        artwork.images = [selected]
-        artwork.display_image_index = args.display_image
-        output = ingest(artwork, force=args.force, allow_duplicate=args.allow_duplicate)
+    else:
+        artwork = fetch_direct(args)
+    selected = next((image for image in artwork.images if image.index == args.display_image), None)
+    if selected is None:
+        available = ", ".join(str(image.index) for image in artwork.images)
+        raise ValueError(f"display image {args.display_image} is unavailable; available pages: {available}")
+    artwork.images = [selected]
+    artwork.display_image_index = args.display_image
+    return ingest(
+        artwork,
+        force=args.force,
+        allow_duplicate=args.allow_duplicate,
+        optimize_archive=args.optimize_source,
+        storage=storage,
+    )
+
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.resident:
+        return serve_jobs(parser, sys.stdin)
+    if not args.source or not args.id:
+        parser.error("--source and --id are required unless --resident is given")
+    try:
+        output = run(args)
         print(f"done: {output}")
         return 0
     except Exception as error:
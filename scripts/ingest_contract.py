@@ -6,6 +6,10 @@ import re
 import unicodedata
 
 VARIANT_WIDTHS = (640, 960, 1600, 2400)
+# 列表页只给比 1:2 更瘦长（条漫长页）或比 2:1 更扁（全景）的图换裁切缩略图，
+# 分别裁成 4:5 与 1:1；其余直接显示整张图，不裁。与 src/lib/media.ts 的 MAX_LIST_RATIO 一致。
+MAX_LIST_RATIO = 2
+CROP_WIDTHS = (640, 960)
 
 # 原图按下载到的字节原样留存，所以扩展名和 Content-Type 必须跟着来源格式走，
 # 不能一律当成 PNG。键是 Pillow 报告的格式名。
@@ -91,3 +95,26 @@ def target_dimensions(width: int, height: int) -> list[tuple[int, int]]:
             dimensions.append((max(1, round(width * edge / height)), edge))
     return dimensions
 
+
+def crop_aspect(width: int, height: int) -> tuple[int, int] | None:
+    """The thumbnail crop aspect the list page uses for a display size, if any."""
+    if height > width * MAX_LIST_RATIO:
+        return 4, 5
+    if width > height * MAX_LIST_RATIO:
+        return 1, 1
+    return None
+
+
+def crop_size(width: int, height: int, aspect: tuple[int, int]) -> tuple[int, int]:
+    """The largest box of the given aspect that fits, spanning the full width or height."""
+    aspect_width, aspect_height = aspect
+    if width * aspect_height >= height * aspect_width:
+        return max(1, min(width, round(height * aspect_width / aspect_height))), height
+    return width, max(1, min(height, round(width * aspect_height / aspect_width)))
+
+
+def crop_dimensions(crop_width: int, aspect: tuple[int, int]) -> list[tuple[int, int]]:
+    """Thumbnail sizes for a crop: every CROP_WIDTHS entry that fits, never upscaled."""
+    aspect_width, aspect_height = aspect
+    widths = [candidate for candidate in CROP_WIDTHS if candidate <= crop_width] or [crop_width]
+    return [(edge, max(1, round(edge * aspect_height / aspect_width))) for edge in widths]
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""Load-test the ingestion pipeline without secrets or network access.
+
+Starts local HTTP stubs that answer like the Pixiv app API, the X API v2 and
+FxTwitter and serve generated image bytes, plus an in-process S3-compatible
+bucket and, with --mirror, a second one fed through MEDIA_MIRRORS. `ingest.py`
+is pointed at them through its origin overrides and driven end to end at the
+requested concurrency; the run ends with a throughput and tail-latency report.
+
+    python scripts/ingest_harness.py --jobs 24 --concurrency 4 --latency-ms 120 --error-rate 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from urllib.parse import parse_qs, unquote, urlparse
+
+HARNESS_BUCKET = "harness-media"
+
+
+@dataclass
+class StubBehaviour:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+    random: random.Random = field(init=False, repr=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.random = random.Random(self.seed)
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+def sample_image(width: int, height: int) -> bytes:
+    """A JPEG with gradients and noise, so encoders spend realistic effort on it."""
+    from PIL import Image
+
+    size = (width, height)
+    noise = Image.effect_noise(size, 48)
+    horizontal = Image.linear_gradient("L").rotate(90).resize(size)
+    vertical = Image.linear_gradient("L").resize(size)
+    image = Image.merge("RGB", (horizontal, vertical, noise))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+def tag_image(payload: bytes, label: str) -> bytes:
+    """Give every served image distinct bytes so duplicate detection stays quiet.
+
+    A JPEG COM segment right after SOI changes the hash without touching pixels.
+    """
+    comment = label.encode()
+    return payload[:2] + b"\xff\xfe" + (len(comment) + 2).to_bytes(2, "big") + comment + payload[2:]
+
+
+class ProviderStub(ThreadingHTTPServer):
+    """Pixiv, X API v2, FxTwitter and image hosting on one local origin."""
+
+    daemon_threads = True
+
+    def __init__(self, behaviour: StubBehaviour, image: bytes):
+        super().__init__(("127.0.0.1", 0), ProviderHandler)
+        self.behaviour = behaviour
+        self.image = image
+        self.requests: dict[str, int] = {}
+        self.failures = 0
+        self.counter_lock = threading.Lock()
+
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, route: str, failed: bool) -> None:
+        with self.counter_lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            self.failures += int(failed)
+
+
+class ProviderHandler(BaseHTTPRequestHandler):
+    server: ProviderStub
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_bytes(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self) -> tuple[str, re.Match | None]:
+        path = urlparse(self.path).path
+        for name, pattern in (
+            ("pixiv-auth", r"^/auth/token$"),
+            ("pixiv-detail", r"^/v1/illust/detail$"),
+            ("x-api", r"^/2/tweets/(\d+)$"),
+            ("fxtwitter", r"^/status/(\d+)$"),
+            ("image", r"^/img/([\w.-]+)\.jpg$"),
+        ):
+            match = re.match(pattern, path)
+            if match:
+                return name, match
+        return "unknown", None
+
+    def handle_request(self) -> None:
+        length = int(self.headers.get("Content-Length", "0") or 0)
+        if length:
+            self.rfile.read(length)
+        name, match = self.route()
+        behaviour = self.server.behaviour
+        time.sleep(behaviour.delay())
+        # 登录不注入故障：真实环境里 token 换取失败会直接让整批作业报错，不是要测的尾延迟。
+        failed = name != "pixiv-auth" and behaviour.should_fail()
+        self.server.count(name, failed)
+        if match is None:
+            self.send_json(404, {"message": "not found"})
+        elif failed:
+            self.send_json(503, {"message": "injected failure"})
+        elif name == "pixiv-auth":
+            self.send_json(200, self.pixiv_token())
+        elif name == "pixiv-detail":
+            illust_id = parse_qs(urlparse(self.path).query).get("illust_id", ["0"])[0]
+            self.send_json(200, self.pixiv_illust(illust_id))
+        elif name == "x-api":
+            self.send_json(200, self.x_tweet(match.group(1)))
+        elif name == "fxtwitter":
+            self.send_json(200, self.fx_status(match.group(1)))
+        else:
+            self.send_bytes(tag_image(self.server.image, match.group(1)), "image/jpeg")
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+    def image_url(self, label: str) -> str:
+        return f"{self.server.origin}/img/{label}.jpg"
+
+    def pixiv_token(self) -> dict:
+        return {
+            "access_token": "harness-access",
+            "refresh_token": "harness-refresh",
+            "expires_in": 3600,
+            "response": {
+                "access_token": "harness-access",
+                "refresh_token": "harness-refresh",
+                "user": {"id": "1"},
+            },
+        }
+
+    def pixiv_illust(self, illust_id: str) -> dict:
+        return {
+            "illust": {
+                "id": int(illust_id),
+                "title": f"Harness {illust_id}",
+                "caption": "",
+                "create_date": "2026-01-01T00:00:00+09:00",
+                "page_count": 1,
+                "meta_single_page": {"original_image_url": self.image_url(f"pixiv-{illust_id}")},
+                "meta_pages": [],
+                "tags": [{"name": "harness"}],
+                "user": {"id": 100, "name": "Harness Artist", "account": "harness"},
+                "total_view": 1000,
+                "total_bookmarks": 100,
+            }
+        }
+
+    def x_tweet(self, status_id: str) -> dict:
+        return {
+            "data": {
+                "id": status_id,
+                "text": f"Harness post {status_id} #harness",
+                "author_id": "200",
+                "created_at": "2026-01-01T00:00:00.000Z",
+                "entities": {"hashtags": [{"tag": "harness"}]},
+                "public_metrics": {"impression_count": 1000, "bookmark_count": 100},
+            },
+            "includes": {
+                "users": [{"id": "200", "name": "Harness Artist", "username": "harness"}],
+                "media": [{"type": "photo", "url": self.image_url(f"x-{status_id}")}],
+            },
+        }
+
+    def fx_status(self, status_id: str) -> dict:
+        return {
+            "code": 200,
+            "message": "OK",
+            "tweet": {
+                "id": status_id,
+                "url": f"https://x.com/harness/status/{status_id}",
+                "text": f"Harness post {status_id} #harness",
+                "created_timestamp": 1767225600,
+                "author": {"id": "200", "name": "Harness Artist", "screen_name": "harness"},
+                "media": {"photos": [{"url": self.image_url(f"fx-{status_id}")}]},
+                "raw_text": {"facets": [{"type": "hashtag", "original": "harness"}]},
+                "views": 1000,
+                "bookmarks": 100,
+            },
+        }
+
+
+class FakeS3(ThreadingHTTPServer):
+    """Path-style S3 subset used by the scripts: HEAD, GET, PUT, DELETE and multi-delete."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeS3Handler)
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def stored_bytes(self) -> int:
+        with self.lock:
+            return sum(len(payload) for payload, _ in self.objects.values())
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    server: FakeS3
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def location(self) -> tuple[str, str]:
+        bucket, _, key = unquote(urlparse(self.path).path).lstrip("/").partition("/")
+        return bucket, key
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", "0") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def reply(self, status: int, body: bytes = b"", headers: dict[str, str] | None = None, head: bool = False) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+
+    def object_headers(self, payload: bytes, content_type: str) -> dict[str, str]:
+        return {
+            "Content-Type": content_type,
+            "ETag": f'"{hashlib.md5(payload).hexdigest()}"',
+            "Last-Modified": formatdate(usegmt=True),
+        }
+
+    def do_HEAD(self) -> None:
+        with self.server.lock:
+            stored = self.server.objects.get(self.location())
+        if stored is None:
+            self.reply(404, head=True)
+            return
+        payload, content_type = stored
+        self.send_response(200)
+        for name, value in self.object_headers(payload, content_type).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            stored = self.server.objects.get(self.location())
+        if stored is None:
+            self.reply(404, b"<Error><Code>NoSuchKey</Code></Error>", {"Content-Type": "application/xml"})
+            return
+        payload, content_type = stored
+        headers = self.object_headers(payload, content_type)
+        requested = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if requested:
+            start = int(requested.group(1))
+            end = min(int(requested.group(2) or len(payload) - 1), len(payload) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(payload)}"
+            self.reply(206, payload[start:end + 1], headers)
+            return
+        self.reply(200, payload, headers)
+
+    def do_PUT(self) -> None:
+        payload = self.read_body()
+        content_type = self.headers.get("Content-Type", "application/octet-stream")
+        with self.server.lock:
+            self.server.objects[self.location()] = (payload, content_type)
+        self.reply(200, headers={"ETag": self.object_headers(payload, content_type)["ETag"]})
+
+    def do_DELETE(self) -> None:
+        with self.server.lock:
+            self.server.objects.pop(self.location(), None)
+        self.reply(204)
+
+    def do_POST(self) -> None:
+        bucket, _ = self.location()
+        keys = re.findall(r"<Key>(.*?)</Key>", self.read_body().decode())
+        with self.server.lock:
+            for key in keys:
+                self.server.objects.pop((bucket, key), None)
+        body = b'<?xml version="1.0" encoding="UTF-8"?><DeleteResult></DeleteResult>'
+        self.reply(200, body, {"Content-Type": "application/xml"})
+
+
+@contextlib.contextmanager
+def serving(server: ThreadingHTTPServer):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def job_arguments(source: str, number: int, provider_origin: str) -> list[str]:
+    if source == "pixiv":
+        return ["--source", "pixiv", "--id", str(900_000_000 + number)]
+    if source == "x":
+        status_id = str(1_900_000_000_000_000_000 + number)
+        return ["--source", "x", "--id", f"https://x.com/harness/status/{status_id}"]
+    return [
+        "--source", "other",
+        "--id", f"harness-{number}",
+        "--source-url", f"https://example.com/harness/{number}",
+        "--image-urls", f"{provider_origin}/img/other-{number}.jpg",
+        "--title", f"Harness {number}",
+        "--author-name", "Harness Artist",
+    ]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile; good enough for a few hundred samples."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # 先截掉浮点误差：0.07 * 100 是 7.000000000000001，直接取整会多跳一位。
+    rank = max(1, math.ceil(round(fraction * len(ordered), 9)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class JobResult:
+    source: str
+    seconds: float
+    error: str = ""
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load-test ingestion against local provider and storage stubs")
+    parser.add_argument("--jobs", type=int, default=12, help="Number of artworks to ingest")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--sources", default="pixiv,x,other", help="Comma separated adapters, used round-robin")
+    parser.add_argument("--x-api", choices=("free", "official"), default="free", help="FxTwitter or the X API v2 shape")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Added to every provider response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of provider responses turned into 503")
+    parser.add_argument("--image-size", default="1600x1200", help="WIDTHxHEIGHT of the served source image")
+    parser.add_argument("--mirror", action="store_true", help="Mirror every upload to a second fake bucket")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the ingest log output")
+    return parser
+
+
+def main() -> int:
+    args = build_parser().parse_args()
+    if args.jobs < 1 or args.concurrency < 1:
+        raise SystemExit("--jobs and --concurrency must be at least 1")
+    if not 0 <= args.error_rate <= 1:
+        raise SystemExit("--error-rate must be between 0 and 1")
+    sources = [source.strip() for source in args.sources.split(",") if source.strip()]
+    if not sources or any(source not in {"pixiv", "x", "other"} for source in sources):
+        raise SystemExit("--sources accepts pixiv, x and other")
+    width, _, height = args.image_size.partition("x")
+
+    behaviour = StubBehaviour(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    provider = ProviderStub(behaviour, sample_image(int(width), int(height)))
+    bucket = FakeS3()
+    mirror = FakeS3()
+    with serving(provider), serving(bucket), serving(mirror), TemporaryDirectory(prefix="sesese-harness-") as workdir:
+        os.environ.update({
+            "PIXIV_API_ORIGIN": provider.origin,
+            "PIXIV_REFRESH_TOKEN": "harness",
+            "X_API_ORIGIN": provider.origin,
+            "FXTWITTER_API_ORIGIN": provider.origin,
+            "R2_ENDPOINT_URL": bucket.endpoint_url,
+            "R2_ACCESS_KEY_ID": "harness",
+            "R2_SECRET_ACCESS_KEY": "harness",
+            "R2_BUCKET": HARNESS_BUCKET,
+        })
+        if args.mirror:
+            os.environ.update({
+                "MEDIA_MIRRORS": "s3:HARNESS_MIRROR",
+                "HARNESS_MIRROR_ENDPOINT_URL": mirror.endpoint_url,
+                "HARNESS_MIRROR_BUCKET": HARNESS_BUCKET,
+                "HARNESS_MIRROR_ACCESS_KEY_ID": "harness",
+                "HARNESS_MIRROR_SECRET_ACCESS_KEY": "harness",
+            })
+        else:
+            os.environ.pop("MEDIA_MIRRORS", None)
+        if args.x_api == "official":
+            os.environ["X_BEARER_TOKEN"] = "harness"
+        else:
+            os.environ.pop("X_BEARER_TOKEN", None)
+
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import ingest
+
+        # 元数据写到临时目录，压测不会在工作区留下作品 JSON 或占用序号。
+        ingest.ROOT = Path(workdir)
+        ingest.CONTENT_DIR = ingest.ROOT / "src" / "content" / "artworks"
+        ingest.SEQUENCE_REGISTRY_PATH = ingest.ROOT / "src" / "content" / "artwork-sequences.json"
+        parser = ingest.build_parser()
+
+        def run_job(number: int) -> JobResult:
+            source = sources[number % len(sources)]
+            job_args = parser.parse_args(job_arguments(source, number, provider.origin))
+            started = time.perf_counter()
+            try:
+                ingest.run(job_args)
+            except Exception as error:
+                return JobResult(source, time.perf_counter() - started, f"{type(error).__name__}: {error}")
+            return JobResult(source, time.perf_counter() - started)
+
+        log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        started = time.perf_counter()
+        with log, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(run_job, range(args.jobs)))
+        elapsed = time.perf_counter() - started
+
+    succeeded = [result.seconds for result in results if not result.error]
+    errors: dict[str, int] = {}
+    for result in results:
+        if result.error:
+            errors[result.error] = errors.get(result.error, 0) + 1
+    report = {
+        "jobs": args.jobs,
+        "concurrency": args.concurrency,
+        "succeeded": len(succeeded),
+        "failed": args.jobs - len(succeeded),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_jobs_per_s": round(len(succeeded) / elapsed, 3) if elapsed else 0.0,
+        "uploaded_mib": round(bucket.stored_bytes / 1024 / 1024, 2),
+        "stored_objects": len(bucket.objects),
+        "mirrored_objects": len(mirror.objects),
+        "latency_s": {
+            "mean": round(statistics.fmean(succeeded), 3) if succeeded else 0.0,
+            "p50": round(percentile(succeeded, 0.50), 3),
+            "p95": round(percentile(succeeded, 0.95), 3),
+            "p99": round(percentile(succeeded, 0.99), 3),
+            "max": round(max(succeeded, default=0.0), 3),
+        },
+        "provider_requests": dict(sorted(provider.requests.items())),
+        "injected_failures": provider.failures,
+        "errors": errors,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        latency = report["latency_s"]
+        print(f"{report['succeeded']}/{args.jobs} artworks in {report['elapsed_s']}s "
+              f"at concurrency {args.concurrency}: {report['throughput_jobs_per_s']} artworks/s")
+        print(f"latency mean {latency['mean']}s p50 {latency['p50']}s p95 {latency['p95']}s "
+              f"p99 {latency['p99']}s max {latency['max']}s")
+        print(f"stored {report['stored_objects']} objects, {report['uploaded_mib']} MiB"
+              + (f", mirrored {report['mirrored_objects']}" if args.mirror else ""))
+        print(f"provider requests {report['provider_requests']}, injected failures {provider.failures}")
+        for message, count in errors.items():
+            print(f"  {count} × {message}")
+    return 0 if succeeded else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Re-derive stale display variants from the archived `source.*` originals.
+
+A variant is stale when its recorded encoder profile differs from the current
+one in DISPLAY_ENCODINGS, or when VARIANT_WIDTHS no longer produce the same key
+and size. Media whose thumbnail crops are missing or stale get all of their
+crops re-framed and re-encoded. Only media with stale variants download their
+original, only those variants are encoded and uploaded, and the artwork JSON is
+updated in place.
+Upstream providers are never contacted, so this works for every source type.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ingest import CONTENT_DIR, ROOT, crop_plan, display_image, encode_crops, encode_planned, variant_plan
+from ingest_contract import crop_aspect, crop_size
+from storage import Storage, open_storage
+
+
+@dataclass
+class MediaJob:
+    path: Path
+    artwork: dict
+    media: dict
+    plan: list[dict]
+    stale: list[dict]
+    obsolete: list[str] = field(default_factory=list)
+    recrop: bool = False
+    encoded: list[dict] | None = None
+    crops: list[dict] | None = None
+
+
+def display_size(media: dict) -> tuple[int, int]:
+    """Upright source size, inferred from the recorded display orientation.
+
+    `source.width/height` are the stored pixels before EXIF rotation; the display
+    variants are upright, so a portrait display of a landscape source means the
+    original carries a 90° orientation tag.
+    """
+    width, height = media["source"]["width"], media["source"]["height"]
+    if (width > height) != (media["width"] > media["height"]) and width != height:
+        return height, width
+    return width, height
+
+
+def recorded_profile(variant: dict) -> str:
+    """The profile a variant was encoded with.
+
+    Variants from before profiles were recorded carry none, but they were all
+    encoded with exactly the parameters that became v1.
+    """
+    return variant.get("profile") or f"{variant.get('format')}-v1"
+
+
+def stale_entries(plan: list[dict], variants: list[dict]) -> list[dict]:
+    recorded = {variant.get("key"): variant for variant in variants if isinstance(variant, dict)}
+    stale: list[dict] = []
+    for entry in plan:
+        current = recorded.get(entry["key"])
+        if (
+            current is None
+            or recorded_profile(current) != entry["profile"]
+            or (current.get("width"), current.get("height")) != (entry["width"], entry["height"])
+        ):
+            stale.append(entry)
+    return stale
+
+
+def crop_entries(prefix: str, size: tuple[int, int], frame: tuple[int, int]) -> list[dict]:
+    """The thumbnail crop variants ingest would derive for this media, if any.
+
+    `size` is the upright source size the crop is cut from, `frame` the display
+    size whose shape decides whether a crop is needed at all.
+    """
+    aspect = crop_aspect(*frame)
+    return crop_plan(prefix, aspect, crop_size(*size, aspect)[0]) if aspect else []
+
+
+def recorded_crop_variants(media: dict) -> list[dict]:
+    return [
+        variant
+        for crop in media.get("crops", [])
+        if isinstance(crop, dict)
+        for variant in crop.get("variants", [])
+        if isinstance(variant, dict)
+    ]
+
+
+def collect_jobs(only: set[str]) -> tuple[list[MediaJob], int]:
+    jobs: list[MediaJob] = []
+    skipped = 0
+    for path in sorted(CONTENT_DIR.glob("*.json")):
+        if only and path.stem not in only:
+            continue
+        try:
+            artwork = json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            continue
+        if artwork.get("schema_version") != 2 or artwork.get("status") == "deleted":
+            continue
+        for media in artwork.get("media", []):
+            if not isinstance(media.get("source"), dict):
+                print(f"skip {path.name} page {media.get('index')}: no archived source to re-encode from")
+                skipped += 1
+                continue
+            prefix = media["source"]["key"].rsplit("/", 1)[0]
+            plan = variant_plan(prefix, *display_size(media))
+            stale = stale_entries(plan, media.get("variants", []))
+            crops = crop_entries(prefix, display_size(media), (plan[-1]["width"], plan[-1]["height"]))
+            # 裁切框取决于整张图的显著度，某个宽度过期也要整组重做。
+            recrop = bool(stale_entries(crops, recorded_crop_variants(media)))
+            planned_keys = {entry["key"] for entry in [*plan, *crops]}
+            obsolete = [
+                variant["key"]
+                for variant in [*media.get("variants", []), *recorded_crop_variants(media)]
+                if isinstance(variant, dict) and variant.get("key") not in planned_keys
+            ]
+            if stale or obsolete or recrop:
+                job = MediaJob(path, artwork, media, plan, stale, obsolete, recrop)
+                if not crops and media.get("crops"):
+                    # 形状不再需要裁切：旧裁切记进 obsolete，元数据里的字段去掉即可，不必编码。
+                    job.crops = []
+                jobs.append(job)
+    return jobs, skipped
+
+
+def reencode(job: MediaJob, storage: Storage) -> list[dict]:
+    from PIL import Image
+
+    source = job.media["source"]
+    raw = storage.get_object(source["key"])
+    expected = source.get("content_hash") or job.media.get("content_hash")
+    actual = f"sha256:{hashlib.sha256(raw).hexdigest()}"
+    if expected and actual != expected:
+        raise RuntimeError(f"{source['key']} does not match its recorded hash; refusing to re-encode from it")
+    with Image.open(io.BytesIO(raw)) as opened:
+        image = display_image(opened)
+        if image.size != display_size(job.media):
+            raise RuntimeError(f"{source['key']} decodes to {image.size}, metadata expects {display_size(job.media)}")
+        variants, uploads = encode_planned(image, job.stale)
+        if job.recrop:
+            frame = (job.plan[-1]["width"], job.plan[-1]["height"]) if job.plan else (job.media["width"], job.media["height"])
+            job.crops, crop_uploads = encode_crops(image, source["key"].rsplit("/", 1)[0], frame)
+            uploads.extend(crop_uploads)
+    for key, payload, content_type in uploads:
+        storage.put_object(key, payload, content_type)
+    return variants
+
+
+def apply_job(job: MediaJob) -> None:
+    """Write a finished job back into its media entry, in plan order."""
+    fresh = {variant["key"]: variant for variant in job.encoded or []}
+    recorded = {variant.get("key"): variant for variant in job.media.get("variants", [])}
+    job.media["variants"] = [fresh.get(entry["key"]) or recorded[entry["key"]] for entry in job.plan]
+    job.media["width"], job.media["height"] = job.plan[-1]["width"], job.plan[-1]["height"]
+    if job.crops:
+        job.media["crops"] = job.crops
+    elif job.crops is not None:
+        job.media.pop("crops", None)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--artwork", action="append", default=[], help="Limit to an artwork ID; repeatable")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--prune", action="store_true", help="Delete objects of variants the current plan dropped")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    jobs, skipped = collect_jobs(set(args.artwork))
+    if not jobs:
+        print(f"all variants are current ({skipped} media without an archived source skipped)")
+        return 0
+    for job in jobs:
+        print(
+            f"{'would re-encode' if args.dry_run else 're-encoding'} {job.path.name} page {job.media['index']}: "
+            f"{len(job.stale)} stale, {len(job.obsolete)} obsolete variants{', re-framing crops' if job.recrop else ''}"
+        )
+    if args.dry_run:
+        return 0
+
+    storage = open_storage(force=True)
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = {pool.submit(reencode, job, storage): job for job in jobs if job.stale or job.recrop}
+        for future, job in futures.items():
+            try:
+                job.encoded = future.result()
+            except Exception as error:
+                print(f"re-encode failed for {job.path.name} page {job.media['index']}: {error}", file=sys.stderr)
+                failures += 1
+
+    touched: dict[Path, dict] = {}
+    for job in jobs:
+        if (job.stale or job.recrop) and job.encoded is None:
+            continue
+        apply_job(job)
+        if args.prune and job.obsolete:
+            storage.delete_objects(job.obsolete)
+            print(f"deleted {len(job.obsolete)} obsolete objects for {job.path.name}")
+        touched[job.path] = job.artwork
+
+    for path, artwork in touched.items():
+        path.write_text(json.dumps(artwork, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {path.relative_to(ROOT)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Refresh provider view and bookmark counts without re-ingesting any media.
+
+Recently collected artworks are polled on every run; older ones are spread over
+a rotation so each is revisited every few runs. Provider calls go through a
+token bucket, Pixiv authors with several collected works are read page by page
+from their work list instead of one detail call per work, and X posts are looked
+up a hundred at a time when the official API is configured. Only artwork JSON
+files whose numbers changed are rewritten.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from cleanup_deleted import parse_datetime
+from ingest import CONTENT_DIR
+
+METRIC_SOURCES = ("pixiv", "x")
+X_LOOKUP_BATCH = 100
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self.lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.sleep((1 - self.tokens) / self.rate)
+
+
+def load_artworks() -> list[tuple[Path, dict]]:
+    artworks: list[tuple[Path, dict]] = []
+    for path in sorted(CONTENT_DIR.glob("*.json")):
+        try:
+            artwork = json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            continue
+        if artwork.get("schema_version") != 2 or artwork.get("status") == "deleted":
+            continue
+        if artwork.get("source", {}).get("type") in METRIC_SOURCES:
+            artworks.append((path, artwork))
+    return artworks
+
+
+def due_artworks(
+    artworks: list[tuple[Path, dict]],
+    now: datetime,
+    recent_days: int,
+    rotation: int,
+) -> list[tuple[Path, dict]]:
+    """Pick this run's artworks, newest collection first.
+
+    Works collected within `recent_days` are always due. Older works fall into
+    one of `rotation` stable buckets by ID, and only today's bucket is polled,
+    so no refresh state has to be stored anywhere.
+    """
+    cutoff = now - timedelta(days=recent_days)
+    slot = (now.date().toordinal() % rotation) if rotation > 1 else 0
+    due: list[tuple[datetime, Path, dict]] = []
+    for path, artwork in artworks:
+        try:
+            collected = parse_datetime(str(artwork.get("collected_at", "")))
+        except ValueError:
+            collected = datetime.min.replace(tzinfo=timezone.utc)
+        bucket = zlib.crc32(str(artwork.get("id", path.stem)).encode()) % rotation if rotation > 1 else 0
+        if collected >= cutoff or bucket == slot:
+            due.append((collected, path, artwork))
+    due.sort(key=lambda item: item[0], reverse=True)
+    return [(path, artwork) for _, path, artwork in due]
+
+
+def merged_metrics(current: object, views: int | None, bookmarks: int | None, min_change: float) -> dict | None:
+    """The metrics object to write, or None when nothing worth committing changed."""
+    existing = dict(current) if isinstance(current, dict) else {}
+    updated = dict(existing)
+    if views is not None:
+        updated["views"] = views
+    if bookmarks is not None:
+        updated["bookmarks"] = bookmarks
+    if updated == existing:
+        return None
+    for name in ("views", "bookmarks"):
+        before, after = existing.get(name), updated.get(name)
+        if before is None or after is None:
+            if before != after:
+                return updated
+        elif abs(after - before) > min_change * max(before, 1):
+            return updated
+    return None
+
+
+def pixiv_metrics(artworks: list[dict], bucket: TokenBucket, max_author_pages: int) -> dict[str, tuple[int, int]]:
+    from ingest import pixiv_api
+
+    wanted = {str(artwork["source"]["id"]): artwork for artwork in artworks}
+    found: dict[str, tuple[int, int]] = {}
+    bucket.acquire()
+    api = pixiv_api()
+
+    by_author: dict[str, set[str]] = {}
+    for source_id, artwork in wanted.items():
+        by_author.setdefault(str(artwork.get("author", {}).get("id", "")), set()).add(source_id)
+    for author_id, ids in by_author.items():
+        # 作者作品列表一页 30 件，同一作者收了两件以上才比逐件查详情省请求。
+        if len(ids) < 2 or not author_id.isdigit():
+            continue
+        query: dict | None = {"user_id": int(author_id)}
+        for _ in range(max_author_pages):
+            if query is None or ids.issubset(found):
+                break
+            bucket.acquire()
+            try:
+                result = api.user_illusts(**query)
+            except Exception as error:
+                # 没翻到的作品下面会逐件查详情。
+                print(f"pixiv author {author_id} list failed: {error}", file=sys.stderr)
+                break
+            for illust in result.get("illusts") or []:
+                source_id = str(illust.get("id"))
+                if source_id in ids:
+                    found[source_id] = (int(illust.get("total_view", 0)), int(illust.get("total_bookmarks", 0)))
+            next_url = result.get("next_url")
+            query = api.parse_qs(next_url) if next_url else None
+
+    for source_id in wanted:
+        if source_id in found:
+            continue
+        bucket.acquire()
+        try:
+            result = api.illust_detail(int(source_id))
+        except Exception as error:
+            print(f"skip pixiv {source_id}: {error}", file=sys.stderr)
+            continue
+        if "illust" not in result:
+            message = result.get("error", {}).get("message", "Unknown Pixiv API error")
+            print(f"skip pixiv {source_id}: {message}", file=sys.stderr)
+            continue
+        found[source_id] = (int(result.illust.total_view), int(result.illust.total_bookmarks))
+    return found
+
+
+def x_metrics(artworks: list[dict], bucket: TokenBucket) -> dict[str, tuple[int, int]]:
+    import requests
+    from ingest import FXTWITTER_API_ORIGIN, X_API_ORIGIN
+
+    ids = [str(artwork["source"]["id"]) for artwork in artworks]
+    found: dict[str, tuple[int, int]] = {}
+    token = os.environ.get("X_BEARER_TOKEN")
+    if token:
+        for start in range(0, len(ids), X_LOOKUP_BATCH):
+            batch = ids[start:start + X_LOOKUP_BATCH]
+            bucket.acquire()
+            try:
+                response = requests.get(
+                    f"{X_API_ORIGIN}/2/tweets",
+                    headers={"Authorization": f"Bearer {token}", "User-Agent": "sesese-se-ingest/2.0"},
+                    params={"ids": ",".join(batch), "tweet.fields": "public_metrics"},
+                    timeout=(15, 45),
+                )
+                response.raise_for_status()
+                payload = response.json()
+            except (requests.RequestException, ValueError) as error:
+                print(f"skip x batch of {len(batch)} from {batch[0]}: {error}", file=sys.stderr)
+                continue
+            for post in payload.get("data", []):
+                metrics = post.get("public_metrics", {})
+                found[str(post["id"])] = (int(metrics.get("impression_count", 0)), int(metrics.get("bookmark_count", 0)))
+        return found
+
+    for status_id in ids:
+        bucket.acquire()
+        try:
+            response = requests.get(
+                f"{FXTWITTER_API_ORIGIN}/status/{status_id}",
+                headers={"User-Agent": "sesese-se-ingest/2.0 (+https://sesese.se)"},
+                timeout=(15, 45),
+            )
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.RequestException, ValueError) as error:
+            print(f"skip x {status_id}: {error}", file=sys.stderr)
+            continue
+        post = payload.get("tweet")
+        if payload.get("code") != 200 or not post:
+            print(f"skip x {status_id}: {payload.get('message', 'no post returned')}", file=sys.stderr)
+            continue
+        found[status_id] = (int(post.get("views") or 0), int(post.get("bookmarks") or 0))
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Refresh artwork view and bookmark counts")
+    parser.add_argument("--recent-days", type=int, default=30, help="Always refresh works collected this recently")
+    parser.add_argument("--rotation", type=int, default=7, help="Spread older works over this many runs")
+    parser.add_argument("--rate", type=float, default=1.0, help="Provider requests per second")
+    parser.add_argument("--burst", type=int, default=5, help="Requests allowed back to back")
+    parser.add_argument("--max-author-pages", type=int, default=3, help="Pixiv work-list pages read per author")
+    parser.add_argument("--min-change", type=float, default=0.0, help="Ignore relative changes at or below this")
+    parser.add_argument("--limit", type=int, default=0, help="Refresh at most this many works (0 = no limit)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.recent_days < 0 or args.rotation < 1 or args.min_change < 0:
+        parser.error("--recent-days and --min-change must be zero or greater, --rotation at least 1")
+
+    due = due_artworks(load_artworks(), datetime.now(timezone.utc), args.recent_days, args.rotation)
+    if args.limit:
+        due = due[: args.limit]
+    if not due:
+        print("no artworks due for a metrics refresh")
+        return 0
+
+    bucket = TokenBucket(args.rate, args.burst)
+    grouped: dict[str, list[tuple[Path, dict]]] = {}
+    for path, artwork in due:
+        grouped.setdefault(artwork["source"]["type"], []).append((path, artwork))
+    changed = failed = 0
+    for source_type, entries in grouped.items():
+        print(f"refreshing {len(entries)} {source_type} artworks")
+        try:
+            if source_type == "pixiv":
+                found = pixiv_metrics([artwork for _, artwork in entries], bucket, args.max_author_pages)
+            else:
+                found = x_metrics([artwork for _, artwork in entries], bucket)
+        except Exception as error:
+            print(f"{source_type} refresh failed: {error}", file=sys.stderr)
+            failed += len(entries)
+            continue
+        for path, artwork in entries:
+            counts = found.get(str(artwork["source"]["id"]))
+            if counts is None:
+                failed += 1
+                continue
+            metrics = merged_metrics(artwork.get("metrics"), *counts, args.min_change)
+            if metrics is None:
+                continue
+            print(f"{'would update' if args.dry_run else 'updated'} {path.name}: {artwork.get('metrics')} -> {metrics}")
+            changed += 1
+            if args.dry_run:
+                continue
+            artwork["metrics"] = metrics
+            path.write_text(json.dumps(artwork, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"{changed} of {len(due)} artworks changed, {failed} could not be refreshed")
+    # 部分来源失败不算整次失败：已经写好的文件照样提交，下一轮再补。
+    return 1 if failed == len(due) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
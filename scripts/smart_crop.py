@@ -0,0 +1,103 @@
+"""Pick fixed-aspect thumbnail crops from a cheap saliency map.
+
+The map is computed on a small copy of the display image and combines three
+signals, each scaled to 0..1: luminance gradient magnitude (edges and line
+art), distance from the mean colour (subjects that stand out from a flat
+background) and local histogram entropy (texture and detail). A crop always
+spans the full width or height of the image, so only its offset along the
+other axis is searched, with a prefix sum over the projected map.
+"""
+
+from __future__ import annotations
+
+from ingest_contract import crop_size
+
+ANALYSIS_EDGE = 256
+ENTROPY_BLOCK = 8
+ENTROPY_LEVELS = 16
+# 各处显著度差不多时（纯色背景、均匀网点）宁可取居中，这个惩罚只够打破近似平局。
+CENTER_BIAS = 0.1
+
+
+def analysis_image(image):
+    """A copy of `image` whose longest edge is at most ANALYSIS_EDGE pixels."""
+    from PIL import Image
+
+    scale = min(1.0, ANALYSIS_EDGE / max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.Resampling.BOX, reducing_gap=2.0) if size != image.size else image
+
+
+def normalized(values):
+    peak = float(values.max())
+    return values / peak if peak > 0 else values
+
+
+def local_entropy(luma):
+    """Shannon entropy of the quantized luminance in each ENTROPY_BLOCK square."""
+    import numpy as np
+
+    height, width = luma.shape
+    rows, columns = -(-height // ENTROPY_BLOCK), -(-width // ENTROPY_BLOCK)
+    levels = np.minimum((luma * ENTROPY_LEVELS).astype(np.intp), ENTROPY_LEVELS - 1)
+    block_y = np.arange(height)[:, None] // ENTROPY_BLOCK
+    block_x = np.arange(width)[None, :] // ENTROPY_BLOCK
+    bins = (block_y * columns + block_x) * ENTROPY_LEVELS + levels
+    counts = np.bincount(bins.ravel(), minlength=rows * columns * ENTROPY_LEVELS)
+    counts = counts.reshape(rows * columns, ENTROPY_LEVELS).astype(np.float32)
+    probabilities = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(probabilities > 0, probabilities * np.log2(probabilities), 0)
+    entropy = -terms.sum(axis=1).reshape(rows, columns)
+    return np.repeat(np.repeat(entropy, ENTROPY_BLOCK, axis=0), ENTROPY_BLOCK, axis=1)[:height, :width]
+
+
+def saliency_map(image):
+    """Per-pixel saliency of the analysis-sized RGB copy of `image`."""
+    import numpy as np
+
+    rgb = np.asarray(analysis_image(image).convert("RGB"), dtype=np.float32) / 255
+    luma = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    gradient_y, gradient_x = np.gradient(luma)
+    edges = np.hypot(gradient_x, gradient_y)
+    contrast = np.linalg.norm(rgb - rgb.mean(axis=(0, 1)), axis=2)
+    return normalized(edges) + normalized(contrast) + normalized(local_entropy(luma))
+
+
+def best_offset(profile, window: int) -> int:
+    """Start of the `window`-long run of `profile` with the highest total."""
+    import numpy as np
+
+    span = len(profile) - window
+    if span <= 0:
+        return 0
+    totals = np.concatenate(([0.0], np.cumsum(profile, dtype=np.float64)))
+    sums = totals[window:] - totals[:-window]
+    distance = np.abs(np.arange(span + 1) - span / 2) / (span / 2)
+    return int(np.argmax(sums - CENTER_BIAS * float(sums.max()) * distance))
+
+
+def crop_boxes(image, aspects) -> list[tuple[int, int, int, int]]:
+    """The most salient box of each aspect as (left, top, right, bottom) in image pixels."""
+    width, height = image.size
+    saliency = None
+    boxes: list[tuple[int, int, int, int]] = []
+    for aspect in aspects:
+        crop_width, crop_height = crop_size(width, height, aspect)
+        if (crop_width, crop_height) == (width, height):
+            boxes.append((0, 0, width, height))
+            continue
+        if saliency is None:
+            saliency = saliency_map(image)
+        grid_height, grid_width = saliency.shape
+        if crop_width < width:
+            window = max(1, round(crop_width * grid_width / width))
+            left = round(best_offset(saliency.sum(axis=0), window) * width / grid_width)
+            left = min(max(0, left), width - crop_width)
+            boxes.append((left, 0, left + crop_width, height))
+        else:
+            window = max(1, round(crop_height * grid_height / height))
+            top = round(best_offset(saliency.sum(axis=1), window) * height / grid_height)
+            top = min(max(0, top), height - crop_height)
+            boxes.append((0, top, width, top + crop_height))
+    return boxes
@@ -0,0 +1,325 @@
+"""Object storage backends shared by the ingest and maintenance scripts.
+
+R2 is the default target. Any other S3-compatible service (B2, OSS, COS, AWS)
+uses the generic S3 backend, and a local directory can hold a plain file copy.
+`MEDIA_MIRRORS` adds secondary targets: every write then fans out to all
+backends concurrently, each with its own retries, while reads stay on the
+primary. Both R2 and mirrors are configured from the environment:
+
+    MEDIA_STORAGE=r2                      primary backend spec (default r2)
+    MEDIA_MIRRORS=s3:B2,local:/mnt/backup comma separated mirror specs
+
+An `s3:NAME` spec reads NAME_ENDPOINT_URL, NAME_BUCKET, NAME_ACCESS_KEY_ID,
+NAME_SECRET_ACCESS_KEY and optionally NAME_REGION.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class Storage(ABC):
+    """A flat key/value object store. Subclasses implement the raw operations."""
+
+    def __init__(self, force: bool = False):
+        self.force = force
+
+    @abstractmethod
+    def describe(self, key: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def head(self, key: str) -> dict | None:
+        """`{"bytes": int, "etag": str | None}` for an existing object, else None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_object(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        """Bytes `start` through `end`, both inclusive."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_objects(self, keys: list[str]) -> None:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.head(key) is not None
+
+    def put_object(self, key: str, payload: bytes, content_type: str) -> None:
+        if not self.force and self.exists(key):
+            print(f"skip existing {self.describe(key)}")
+            return
+        self.write(key, payload, content_type)
+        print(f"uploaded {self.describe(key)} ({len(payload)} bytes)")
+
+
+class S3Storage(Storage):
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "auto",
+        scheme: str = "s3",
+        force: bool = False,
+    ):
+        import boto3
+        from botocore.config import Config
+
+        super().__init__(force)
+        self.bucket = bucket
+        self.scheme = scheme
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+            config=Config(
+                signature_version="s3v4",
+                retries={"max_attempts": 4, "mode": "standard"},
+                max_pool_connections=32,
+            ),
+        )
+
+    @classmethod
+    def from_environment(cls, prefix: str, force: bool = False) -> S3Storage:
+        values = {
+            name: os.environ.get(f"{prefix}_{name}")
+            for name in ("ENDPOINT_URL", "BUCKET", "ACCESS_KEY_ID", "SECRET_ACCESS_KEY")
+        }
+        missing = [f"{prefix}_{name}" for name, value in values.items() if not value]
+        if missing:
+            raise RuntimeError(f"{', '.join(missing)} required for the s3:{prefix} backend")
+        return cls(
+            values["ENDPOINT_URL"],
+            values["BUCKET"],
+            values["ACCESS_KEY_ID"],
+            values["SECRET_ACCESS_KEY"],
+            region=os.environ.get(f"{prefix}_REGION", "auto"),
+            scheme=prefix.lower(),
+            force=force,
+        )
+
+    def describe(self, key: str) -> str:
+        return f"{self.scheme}://{self.bucket}/{key}"
+
+    def head(self, key: str) -> dict | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as error:
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status == 404:
+                return None
+            raise
+        return {"bytes": int(response["ContentLength"]), "etag": response.get("ETag", "").strip('"') or None}
+
+    def get_object(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}")["Body"].read()
+
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=payload,
+            ContentType=content_type,
+            CacheControl=CACHE_CONTROL,
+        )
+
+    def delete_objects(self, keys: list[str]) -> None:
+        for start in range(0, len(keys), 1000):
+            result = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[start:start + 1000]], "Quiet": True},
+            )
+            if result.get("Errors"):
+                raise RuntimeError(f"{self.scheme} failed to delete objects: {result['Errors']}")
+
+
+class R2Storage(S3Storage):
+    def __init__(self, force: bool = False):
+        account_id = os.environ.get("CLOUDFLARE_ACCOUNT_ID")
+        access_key = os.environ.get("R2_ACCESS_KEY_ID")
+        secret_key = os.environ.get("R2_SECRET_ACCESS_KEY")
+        endpoint_url = os.environ.get("R2_ENDPOINT_URL")
+        if not (account_id or endpoint_url) or not access_key or not secret_key:
+            raise RuntimeError(
+                "CLOUDFLARE_ACCOUNT_ID, R2_ACCESS_KEY_ID, and R2_SECRET_ACCESS_KEY are required"
+            )
+        super().__init__(
+            endpoint_url or f"https://{account_id}.r2.cloudflarestorage.com",
+            os.environ.get("R2_BUCKET", "sesese-se-media"),
+            access_key,
+            secret_key,
+            scheme="r2",
+            force=force,
+        )
+
+
+class LocalStorage(Storage):
+    """Objects as plain files under `root`, laid out by key."""
+
+    def __init__(self, root: Path, force: bool = False):
+        super().__init__(force)
+        self.root = root.resolve()
+
+    def path(self, key: str) -> Path:
+        parts = PurePosixPath(key).parts
+        if not parts or key.startswith("/") or ".." in parts:
+            raise ValueError(f"unsafe object key: {key}")
+        return self.root.joinpath(*parts)
+
+    def describe(self, key: str) -> str:
+        return self.path(key).as_uri()
+
+    def head(self, key: str) -> dict | None:
+        path = self.path(key)
+        return {"bytes": path.stat().st_size, "etag": None} if path.is_file() else None
+
+    def get_object(self, key: str) -> bytes:
+        return self.path(key).read_bytes()
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        with self.path(key).open("rb") as handle:
+            handle.seek(start)
+            return handle.read(end - start + 1)
+
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再改名，中途失败不会留下半个文件冒充完整对象。
+        handle = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", delete=False)
+        try:
+            with handle:
+                handle.write(payload)
+            os.replace(handle.name, path)
+        except BaseException:
+            Path(handle.name).unlink(missing_ok=True)
+            raise
+
+    def delete_objects(self, keys: list[str]) -> None:
+        for key in keys:
+            self.path(key).unlink(missing_ok=True)
+
+
+class MirrorStorage(Storage):
+    """Reads from the primary; writes and deletes fan out to every backend.
+
+    Each backend applies its own skip-if-exists check, so a mirror that missed
+    an object earlier is filled in even when the primary already has it.
+    """
+
+    def __init__(self, primary: Storage, mirrors: list[Storage], attempts: int = 3, backoff: float = 1.0):
+        self.primary = primary
+        self.mirrors = mirrors
+        self.attempts = attempts
+        self.backoff = backoff
+        super().__init__(primary.force)
+
+    @property
+    def backends(self) -> list[Storage]:
+        return [self.primary, *self.mirrors]
+
+    @property
+    def force(self) -> bool:
+        return self.primary.force
+
+    @force.setter
+    def force(self, value: bool) -> None:
+        # 常驻模式按作业切换 force，要同步给每个后端。
+        for backend in self.backends:
+            backend.force = value
+
+    def describe(self, key: str) -> str:
+        return self.primary.describe(key)
+
+    def head(self, key: str) -> dict | None:
+        return self.primary.head(key)
+
+    def get_object(self, key: str) -> bytes:
+        return self.primary.get_object(key)
+
+    def get_range(self, key: str, start: int, end: int) -> bytes:
+        return self.primary.get_range(key, start, end)
+
+    def retrying(self, backend: Storage, action: str, operation) -> None:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                operation()
+                return
+            except Exception as error:
+                if attempt == self.attempts:
+                    raise RuntimeError(f"{action} failed on {type(backend).__name__}: {error}") from error
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def fan_out(self, action: str, operation) -> None:
+        """Run `operation` on the primary in this thread and on every mirror alongside it.
+
+        Each call gets its own short-lived pool, so callers that upload from
+        several threads at once never queue behind each other's mirror writes.
+        """
+        errors: list[str] = []
+        with ThreadPoolExecutor(max_workers=max(1, len(self.mirrors)), thread_name_prefix="mirror") as pool:
+            futures = [
+                pool.submit(self.retrying, backend, action, lambda backend=backend: operation(backend))
+                for backend in self.mirrors
+            ]
+            try:
+                self.retrying(self.primary, action, lambda: operation(self.primary))
+            except RuntimeError as error:
+                errors.append(str(error))
+            errors.extend(str(future.exception()) for future in futures if future.exception())
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        self.fan_out(f"write {key}", lambda backend: backend.write(key, payload, content_type))
+
+    def put_object(self, key: str, payload: bytes, content_type: str) -> None:
+        self.fan_out(f"upload {key}", lambda backend: backend.put_object(key, payload, content_type))
+
+    def delete_objects(self, keys: list[str]) -> None:
+        self.fan_out(f"delete {len(keys)} objects", lambda backend: backend.delete_objects(keys))
+
+
+def storage_from_spec(spec: str, force: bool = False) -> Storage:
+    kind, _, argument = spec.strip().partition(":")
+    if kind == "r2" and not argument:
+        return R2Storage(force=force)
+    if kind == "s3" and argument:
+        return S3Storage.from_environment(argument.upper(), force=force)
+    if kind == "local" and argument:
+        return LocalStorage(Path(argument).expanduser(), force=force)
+    raise ValueError(f"unknown storage spec {spec!r}; use r2, s3:NAME, or local:/path")
+
+
+def open_storage(force: bool = False) -> Storage:
+    """The configured primary backend, wrapped in a mirror when MEDIA_MIRRORS is set."""
+    primary = storage_from_spec(os.environ.get("MEDIA_STORAGE") or "r2", force=force)
+    mirrors = [
+        storage_from_spec(spec, force=force)
+        for spec in (os.environ.get("MEDIA_MIRRORS") or "").split(",")
+        if spec.strip()
+    ]
+    return MirrorStorage(primary, mirrors) if mirrors else primary
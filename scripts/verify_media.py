@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Check that every object the artwork metadata references is intact in storage.
+
+Every key gets a HEAD request for existence and size. Archived `source.*`
+objects are also streamed through SHA-256 with ranged reads, so large originals
+are fetched in parallel pieces, and compared with the recorded content hash.
+Variants and crops carry no recorded hash, so same-size corruption of one goes
+unnoticed; it is cheap to rebuild once spotted, unlike the original.
+Missing or size-mismatched variants can be re-derived from an intact source
+with --repair; a broken source can only be fixed by re-ingesting the artwork.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from ingest import CONTENT_DIR, ROOT, encoder_profile
+from reencode import MediaJob, recorded_crop_variants, reencode
+from storage import Storage, open_storage
+
+RANGE_BYTES = 8 * 1024 * 1024
+RANGES_IN_FLIGHT = 4
+
+
+@dataclass
+class ExpectedObject:
+    artwork_id: str
+    page: int
+    key: str
+    kind: str
+    bytes: int | None
+    content_hash: str | None = None
+
+
+@dataclass
+class Issue:
+    artwork_id: str
+    page: int
+    key: str
+    kind: str
+    problem: str
+    detail: str = ""
+
+
+def expected_objects(artwork: dict) -> list[ExpectedObject]:
+    """Every object an artwork references, with the size and hash it should have."""
+    expected: list[ExpectedObject] = []
+    artwork_id = str(artwork.get("id", ""))
+    for media in artwork.get("media", []):
+        page = int(media.get("index", 0))
+        source = media.get("source")
+        if isinstance(source, dict) and source.get("key"):
+            # 做过无损重打包的存档另有自己的哈希；否则存档就是下载字节，用 media 上的哈希。
+            expected.append(ExpectedObject(
+                artwork_id,
+                page,
+                source["key"],
+                "source",
+                source.get("bytes"),
+                source.get("content_hash") or media.get("content_hash"),
+            ))
+        for variant in media.get("variants", []):
+            if isinstance(variant, dict) and variant.get("key"):
+                expected.append(ExpectedObject(artwork_id, page, variant["key"], "variant", variant.get("bytes")))
+        for variant in recorded_crop_variants(media):
+            if variant.get("key"):
+                expected.append(ExpectedObject(artwork_id, page, variant["key"], "crop", variant.get("bytes")))
+    return expected
+
+
+def sha256_ranged(storage: Storage, key: str, size: int, ranges: ThreadPoolExecutor) -> str:
+    """Hash an object from parallel ranged reads, feeding the digest in order.
+
+    A few ranges stay in flight ahead of the hasher, so memory stays bounded
+    while network latency overlaps with hashing.
+    """
+    digest = hashlib.sha256()
+    pending: deque = deque()
+    offsets = iter(range(0, size, RANGE_BYTES))
+    for offset in offsets:
+        pending.append(ranges.submit(storage.get_range, key, offset, min(offset + RANGE_BYTES, size) - 1))
+        if len(pending) >= RANGES_IN_FLIGHT:
+            break
+    while pending:
+        digest.update(pending.popleft().result())
+        offset = next(offsets, None)
+        if offset is not None:
+            pending.append(ranges.submit(storage.get_range, key, offset, min(offset + RANGE_BYTES, size) - 1))
+    return f"sha256:{digest.hexdigest()}"
+
+
+def check_object(storage: Storage, expected: ExpectedObject, ranges: ThreadPoolExecutor | None) -> Issue | None:
+    def issue(problem: str, detail: str = "") -> Issue:
+        return Issue(expected.artwork_id, expected.page, expected.key, expected.kind, problem, detail)
+
+    try:
+        head = storage.head(expected.key)
+    except Exception as error:
+        return issue("unreadable", str(error))
+    if head is None:
+        return issue("missing")
+    if expected.bytes is not None and head["bytes"] != expected.bytes:
+        return issue("size-mismatch", f"stored {head['bytes']} bytes, metadata says {expected.bytes}")
+    if expected.kind == "source" and expected.content_hash and ranges is not None:
+        try:
+            actual = sha256_ranged(storage, expected.key, head["bytes"], ranges)
+        except Exception as error:
+            return issue("unreadable", str(error))
+        if actual != expected.content_hash:
+            return issue("hash-mismatch", f"stored {actual}, metadata says {expected.content_hash}")
+    return None
+
+
+def load_artworks(only: set[str]) -> list[tuple[Path, dict]]:
+    artworks: list[tuple[Path, dict]] = []
+    for path in sorted(CONTENT_DIR.glob("*.json")):
+        if only and path.stem not in only:
+            continue
+        try:
+            artwork = json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            continue
+        if artwork.get("schema_version") == 2:
+            artworks.append((path, artwork))
+    return artworks
+
+
+def verify(
+    storage: Storage,
+    artworks: list[tuple[Path, dict]],
+    concurrency: int,
+    hash_sources: bool,
+) -> tuple[int, list[Issue]]:
+    objects = [expected for _, artwork in artworks for expected in expected_objects(artwork)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, ThreadPoolExecutor(max_workers=concurrency) as ranges:
+        results = pool.map(lambda expected: check_object(storage, expected, ranges if hash_sources else None), objects)
+        issues = [result for result in results if result is not None]
+    return len(objects), issues
+
+
+def repair(storage: Storage, artworks: list[tuple[Path, dict]], issues: list[Issue]) -> list[Issue]:
+    """Re-derive broken variants from intact sources; return what is still broken."""
+    broken_sources = {(issue.artwork_id, issue.page) for issue in issues if issue.kind == "source"}
+    broken_variants = {issue.key for issue in issues if issue.kind == "variant"}
+    broken_crops = {issue.key for issue in issues if issue.kind == "crop"}
+    by_id = {str(artwork.get("id")): (path, artwork) for path, artwork in artworks}
+    repaired: set[str] = set()
+    touched: dict[Path, dict] = {}
+    for artwork_id, (path, artwork) in by_id.items():
+        for media in artwork.get("media", []):
+            entries = [
+                {**variant, "profile": encoder_profile(variant.get("format", ""))}
+                for variant in media.get("variants", [])
+                if variant.get("key") in broken_variants
+            ]
+            entries = [entry for entry in entries if entry["profile"]]
+            recrop = any(variant.get("key") in broken_crops for variant in recorded_crop_variants(media))
+            if (
+                not (entries or recrop)
+                or (artwork_id, media.get("index")) in broken_sources
+                or not isinstance(media.get("source"), dict)
+            ):
+                continue
+            entries.sort(key=lambda entry: (entry["width"], entry["height"]))
+            job = MediaJob(path, artwork, media, plan=[], stale=entries, recrop=recrop)
+            try:
+                fresh = reencode(job, storage)
+            except Exception as error:
+                print(f"repair failed for {path.name} page {media.get('index')}: {error}", file=sys.stderr)
+                continue
+            replaced = {variant["key"]: variant for variant in fresh}
+            media["variants"] = [replaced.get(variant.get("key"), variant) for variant in media["variants"]]
+            repaired.update(replaced)
+            if job.crops:
+                media["crops"] = job.crops
+                repaired.update(variant["key"] for crop in job.crops for variant in crop["variants"])
+            touched[path] = artwork
+    for path, artwork in touched.items():
+        path.write_text(json.dumps(artwork, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"wrote {path.relative_to(ROOT)}")
+    return [issue for issue in issues if issue.key not in repaired]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verify stored media against artwork metadata")
+    parser.add_argument("--artwork", action="append", default=[], help="Limit to an artwork ID; repeatable")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel HEAD requests and ranged reads")
+    parser.add_argument("--skip-hash", action="store_true", help="Only check existence and size")
+    parser.add_argument("--repair", action="store_true", help="Re-derive broken variants from intact sources")
+    parser.add_argument("--report", type=Path, help="Write the issues as JSON to this file")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    storage = open_storage(force=True)
+    artworks = load_artworks(set(args.artwork))
+    checked, issues = verify(storage, artworks, args.concurrency, not args.skip_hash)
+    for issue in issues:
+        print(f"{issue.problem} {issue.kind} {issue.key} ({issue.artwork_id}){': ' + issue.detail if issue.detail else ''}")
+    if issues and args.repair:
+        issues = repair(storage, artworks, issues)
+        for issue in issues:
+            hint = "re-ingest the artwork" if issue.kind == "source" else "could not be re-derived"
+            print(f"still broken: {issue.key} ({hint})")
+    if args.report:
+        args.report.write_text(json.dumps([asdict(issue) for issue in issues], ensure_ascii=False, indent=2) + "\n")
+    print(f"checked {checked} objects across {len(artworks)} artworks, {len(issues)} problems")
+    return 1 if issues else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
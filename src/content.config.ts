@@ -8,16 +8,38 @@ const variantSchema = z.object({
   width: z.number().int().positive(),
   height: z.number().int().positive(),
   bytes: z.number().int().nonnegative().optional(),
+  // 编码档版本，如 avif-v1；scripts/reencode.py 据此找出过期变体。早期变体没有。
+  profile: z.string().optional(),
 });
 
 // 采集时原样留存的来源文件。只作存档，不参与 srcset —— 展示一律走 variants。
 // 早于原图留存的藏品没有这个字段，所以是 optional。
+// 开启存档优化后存的是逐像素校验过的无损重打包：bytes 是存档大小，
+// original_bytes 是下载大小，content_hash 是存档字节的哈希。
 const sourceSchema = z.object({
   key: z.string(),
   format: z.enum(["png", "jpg", "webp", "gif", "avif"]),
   width: z.number().int().positive(),
   height: z.number().int().positive(),
   bytes: z.number().int().nonnegative(),
+  original_bytes: z.number().int().nonnegative().optional(),
+  content_hash: z
+    .string()
+    .regex(/^sha256:[a-f0-9]{64}$/)
+    .optional(),
+});
+
+// 列表页用的定比例缩略图。box 是裁切框在 media.width × media.height 坐标里的位置，
+// 按显著度选出；早于裁切缩略图的藏品没有这个字段，由 scripts/reencode.py 补齐。
+const cropSchema = z.object({
+  aspect: z.enum(["1:1", "4:5"]),
+  box: z.object({
+    x: z.number().int().nonnegative(),
+    y: z.number().int().nonnegative(),
+    width: z.number().int().positive(),
+    height: z.number().int().positive(),
+  }),
+  variants: z.array(variantSchema).min(1),
 });
 
 const artworkSchema = z
@@ -71,6 +93,7 @@ const artworkSchema = z
             .optional(),
           source: sourceSchema.optional(),
           variants: z.array(variantSchema).min(1),
+          crops: z.array(cropSchema).optional(),
         }),
       )
       .min(1),
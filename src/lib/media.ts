@@ -2,6 +2,13 @@ import type { ArtworkMedia, MediaVariant } from "../types/artwork";
 
 const DEFAULT_MEDIA_ORIGIN = "https://media.sesese.se";
 
+// 比这更瘦长或更扁的图（条漫长页、全景）在列表里换成裁切缩略图，
+// 否则一格里只剩一道细缝，或者缩成一张邮票。采集端只为这些图生成裁切，
+// 规则在 scripts/ingest_contract.py 的 crop_aspect，两边要一起改。
+const MAX_LIST_RATIO = 2;
+
+type VariantSet = Pick<ArtworkMedia, "variants">;
+
 export const mediaOrigin = (
   import.meta.env.PUBLIC_MEDIA_ORIGIN || DEFAULT_MEDIA_ORIGIN
 ).replace(/\/$/, "");
@@ -11,7 +18,7 @@ export function mediaUrl(key: string): string {
 }
 
 export function variantsByFormat(
-  media: ArtworkMedia,
+  media: VariantSet,
   format: MediaVariant["format"],
 ) {
   return media.variants
@@ -20,7 +27,7 @@ export function variantsByFormat(
 }
 
 export function srcset(
-  media: ArtworkMedia,
+  media: VariantSet,
   format: MediaVariant["format"],
 ): string | undefined {
   const variants = variantsByFormat(media, format);
@@ -30,7 +37,7 @@ export function srcset(
     .join(", ");
 }
 
-export function fallbackVariant(media: ArtworkMedia): MediaVariant {
+export function fallbackVariant(media: VariantSet): MediaVariant {
   const preferred = variantsByFormat(media, "webp");
   const candidates =
     preferred.length > 0
@@ -38,3 +45,22 @@ export function fallbackVariant(media: ArtworkMedia): MediaVariant {
       : [...media.variants].sort((a, b) => a.width - b.width);
   return candidates.at(-1)!;
 }
+
+export function listThumbnail(
+  media: ArtworkMedia,
+): VariantSet & { width: number; height: number } {
+  const ratio = media.height / media.width;
+  const aspect =
+    ratio > MAX_LIST_RATIO
+      ? "4:5"
+      : ratio < 1 / MAX_LIST_RATIO
+        ? "1:1"
+        : undefined;
+  const crop = aspect && media.crops?.find((item) => item.aspect === aspect);
+  if (!crop) return media;
+  return {
+    variants: crop.variants,
+    width: crop.box.width,
+    height: crop.box.height,
+  };
+}
@@ -14,6 +14,8 @@ export interface MediaVariant {
   width: number;
   height: number;
   bytes?: number;
+  /** 编码档版本，如 `avif-v1`。 */
+  profile?: string;
 }
 
 /** 原样留存的来源文件。只作存档与将来重编码的输入，不参与展示。 */
@@ -23,6 +25,18 @@ export interface MediaSource {
   width: number;
   height: number;
   bytes: number;
+  /** 存档经过无损重打包时，下载到的原始大小。 */
+  original_bytes?: number;
+  /** 存档经过无损重打包时，存档字节本身的哈希。 */
+  content_hash?: string;
+}
+
+/** 列表页用的定比例缩略图，裁切框按显著度选出。 */
+export interface MediaCrop {
+  aspect: "1:1" | "4:5";
+  /** 裁切框，坐标系是 media 的 width × height。 */
+  box: { x: number; y: number; width: number; height: number };
+  variants: MediaVariant[];
 }
 
 export interface ArtworkMedia {
@@ -33,6 +47,7 @@ export interface ArtworkMedia {
   content_hash?: string;
   source?: MediaSource;
   variants: MediaVariant[];
+  crops?: MediaCrop[];
 }
 
 export interface Artwork {
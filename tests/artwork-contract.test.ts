@@ -6,6 +6,35 @@ import {
   sanitizeTags,
   validateArtworkId,
 } from "../src/domain/artwork-contract";
+import { listThumbnail } from "../src/lib/media";
+import type { ArtworkMedia, MediaCrop } from "../src/types/artwork";
+
+function media(width: number, height: number, crops?: MediaCrop[]) {
+  return {
+    index: 1,
+    width,
+    height,
+    variants: [
+      { key: "media/x/1/original.webp", format: "webp", width, height },
+    ],
+    crops,
+  } satisfies ArtworkMedia;
+}
+
+function crop(aspect: MediaCrop["aspect"], width: number, height: number) {
+  return {
+    aspect,
+    box: { x: 0, y: 0, width, height },
+    variants: [
+      {
+        key: `media/x/1/crop-${aspect.replace(":", "x")}-640w.webp`,
+        format: "webp",
+        width: 640,
+        height: (640 * height) / width,
+      },
+    ],
+  } satisfies MediaCrop;
+}
 
 describe("artwork contract", () => {
   it("normalizes supported source URLs", () => {
@@ -40,3 +69,34 @@ describe("artwork contract", () => {
     expect(isArtworkStatus("draft")).toBe(false);
   });
 });
+
+// 阈值要与 scripts/ingest_contract.py 的 crop_aspect 一致：只有比 1:2 更瘦长
+// 或比 2:1 更扁的图才有裁切可用。
+describe("list thumbnails", () => {
+  it("uses the 4:5 crop only for pages taller than 1:2", () => {
+    const portrait = crop("4:5", 600, 750);
+    expect(listThumbnail(media(600, 2400, [portrait]))).toEqual({
+      variants: portrait.variants,
+      width: 600,
+      height: 750,
+    });
+    const edge = media(1000, 2000, [crop("4:5", 1000, 1250)]);
+    expect(listThumbnail(edge)).toBe(edge);
+  });
+
+  it("uses the 1:1 crop only for images wider than 2:1", () => {
+    const square = crop("1:1", 1000, 1000);
+    expect(listThumbnail(media(2400, 1000, [square])).variants).toBe(
+      square.variants,
+    );
+    const edge = media(2000, 1000, [crop("1:1", 1000, 1000)]);
+    expect(listThumbnail(edge)).toBe(edge);
+  });
+
+  it("falls back to the full frame without a matching crop", () => {
+    const legacy = media(600, 2400);
+    expect(listThumbnail(legacy)).toBe(legacy);
+    const mismatched = media(600, 2400, [crop("1:1", 600, 600)]);
+    expect(listThumbnail(mismatched)).toBe(mismatched);
+  });
+});
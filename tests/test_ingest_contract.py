@@ -5,6 +5,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
 
 from ingest_contract import (  # noqa: E402
+    crop_aspect,
+    crop_dimensions,
+    crop_size,
     normalize_author_name,
     parse_x_status,
     safe_identifier,
@@ -27,6 +30,19 @@ class IngestContractTest(unittest.TestCase):
     def test_builds_responsive_dimensions(self):
         self.assertEqual(target_dimensions(1200, 800), [(640, 427), (960, 640), (1200, 800)])
 
+    def test_crops_only_slivers_and_panoramas(self):
+        self.assertEqual(crop_aspect(600, 2400), (4, 5))
+        self.assertEqual(crop_aspect(2400, 1000), (1, 1))
+        self.assertIsNone(crop_aspect(1200, 2200))
+        self.assertIsNone(crop_aspect(1600, 1200))
+        self.assertIsNone(crop_aspect(1000, 2000))
+
+    def test_sizes_crops_without_upscaling(self):
+        self.assertEqual(crop_size(1000, 4000, (4, 5)), (1000, 1250))
+        self.assertEqual(crop_size(3000, 800, (1, 1)), (800, 800))
+        self.assertEqual(crop_dimensions(1000, (4, 5)), [(640, 800), (960, 1200)])
+        self.assertEqual(crop_dimensions(500, (1, 1)), [(500, 500)])
+
     def test_sanitizes_identifier_and_title(self):
         self.assertEqual(safe_identifier("artist / 123"), "artist-123")
         self.assertEqual(x_title("#art https://example.com", "作者", "123"), "作者 · X 123")
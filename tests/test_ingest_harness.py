@@ -0,0 +1,22 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from ingest_harness import percentile  # noqa: E402
+
+
+class IngestHarnessTest(unittest.TestCase):
+    def test_uses_nearest_rank_percentiles(self):
+        samples = [float(value) for value in range(100, 0, -1)]
+        self.assertEqual(percentile(samples, 0.5), 50)
+        self.assertEqual(percentile(samples, 0.95), 95)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile(samples, 0.07), 7)
+        self.assertEqual(percentile([3.0], 0.99), 3)
+        self.assertEqual(percentile([], 0.95), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import subprocess
+import sys
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from ingest import optimize_source, png_chunks, png_header, same_pixels  # noqa: E402
+
+
+def png(image: Image.Image, **options) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="PNG", **options)
+    return output.getvalue()
+
+
+def jpeg(image: Image.Image, **options) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="JPEG", **options)
+    return output.getvalue()
+
+
+def gradient(mode: str = "RGB") -> Image.Image:
+    image = Image.new("RGB", (64, 48))
+    image.putdata([(x * 4, y * 5, (x + y) % 256) for y in range(48) for x in range(64)])
+    return image.convert(mode)
+
+
+def with_chunk(data: bytes, kind: bytes, payload: bytes) -> bytes:
+    chunk = len(payload).to_bytes(4, "big") + kind + payload + zlib.crc32(kind + payload).to_bytes(4, "big")
+    return data[:33] + chunk + data[33:]
+
+
+def optimized(raw: bytes) -> bytes | None:
+    with Image.open(io.BytesIO(raw)) as opened:
+        return optimize_source(raw, opened)
+
+
+def with_jpegtran(raw: bytes, output: bytes) -> bytes | None:
+    result = subprocess.CompletedProcess(["jpegtran"], 0, stdout=output, stderr=b"")
+    with (
+        mock.patch("ingest.shutil.which", return_value="/usr/bin/jpegtran"),
+        mock.patch("ingest.subprocess.run", return_value=result) as run,
+    ):
+        repacked = optimized(raw)
+    run.assert_called_once()
+    return repacked
+
+
+class OptimizeSourceTest(unittest.TestCase):
+    def test_accepts_a_smaller_pixel_identical_8_bit_png(self):
+        raw = png(gradient(), compress_level=0)
+        repacked = optimized(raw)
+        self.assertIsNotNone(repacked)
+        self.assertLess(len(repacked), len(raw))
+        self.assertEqual(png_header(repacked), png_header(raw))
+        with Image.open(io.BytesIO(raw)) as original, Image.open(io.BytesIO(repacked)) as result:
+            self.assertTrue(same_pixels(original, result))
+
+    def test_rejects_16_bit_png(self):
+        raw = png(Image.new("I;16", (64, 48), 40000), compress_level=0)
+        self.assertEqual(png_header(raw)[0], 16)
+        self.assertIsNone(optimized(raw))
+
+    def test_accepts_palette_png(self):
+        raw = png(gradient().quantize(32), compress_level=0)
+        repacked = optimized(raw)
+        self.assertIsNotNone(repacked)
+        with Image.open(io.BytesIO(repacked)) as result:
+            self.assertEqual(result.mode, "P")
+
+    def test_carries_color_chunks_over(self):
+        raw = with_chunk(png(gradient(), compress_level=0), b"gAMA", (45455).to_bytes(4, "big"))
+        raw = with_chunk(raw, b"sRGB", b"\x00")
+        repacked = optimized(raw)
+        self.assertIsNotNone(repacked)
+        self.assertEqual(
+            [kind for kind, _ in png_chunks(repacked) if kind in (b"gAMA", b"sRGB")],
+            [kind for kind, _ in png_chunks(raw) if kind in (b"gAMA", b"sRGB")],
+        )
+        with Image.open(io.BytesIO(repacked)) as result:
+            self.assertEqual(result.info.get("gamma"), 0.45455)
+            self.assertEqual(result.info.get("srgb"), 0)
+
+    def test_skips_animated_files(self):
+        frames = [Image.new("P", (16, 16), index) for index in range(3)]
+        output = io.BytesIO()
+        frames[0].save(output, format="PNG", save_all=True, append_images=frames[1:], compress_level=0)
+        self.assertIsNone(optimized(output.getvalue()))
+
+    def test_keeps_the_original_when_the_candidate_is_not_smaller(self):
+        self.assertIsNone(optimized(png(gradient(), optimize=True, compress_level=9)))
+
+    def test_accepts_a_pixel_identical_jpegtran_output(self):
+        raw = jpeg(gradient(), quality=90)
+        # 只优化哈夫曼表，DCT 系数不变，解码结果与原图逐像素相同。
+        smaller = jpeg(gradient(), quality=90, optimize=True)
+        self.assertLess(len(smaller), len(raw))
+        self.assertEqual(with_jpegtran(raw, smaller), smaller)
+
+    def test_rejects_a_jpegtran_output_with_different_pixels(self):
+        raw = jpeg(gradient(), quality=90)
+        requantized = jpeg(gradient(), quality=40)
+        self.assertLess(len(requantized), len(raw))
+        self.assertIsNone(with_jpegtran(raw, requantized))
+
+    def test_keeps_jpegs_as_is_without_jpegtran(self):
+        with mock.patch("ingest.shutil.which", return_value=None), mock.patch("ingest.subprocess.run") as run:
+            self.assertIsNone(optimized(jpeg(gradient(), quality=90)))
+        run.assert_not_called()
+
+    def test_compares_palette_images_by_color(self):
+        first = Image.new("P", (2, 1))
+        first.putpalette([255, 0, 0, 0, 0, 255])
+        first.putdata([0, 1])
+        second = Image.new("P", (2, 1))
+        second.putpalette([0, 0, 255, 255, 0, 0])
+        second.putdata([1, 0])
+        self.assertTrue(same_pixels(first, second))
+        second.putdata([0, 1])
+        self.assertFalse(same_pixels(first, second))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from ingest import variant_plan  # noqa: E402
+from reencode import MediaJob, apply_job, crop_entries, display_size, stale_entries  # noqa: E402
+
+PREFIX = "media/other/sample/1"
+
+
+def recorded(plan: list[dict]) -> list[dict]:
+    return [{**entry, "bytes": 10} for entry in plan]
+
+
+class ReencodeTest(unittest.TestCase):
+    def test_only_changed_profiles_and_sizes_are_stale(self):
+        plan = variant_plan(PREFIX, 1200, 800)
+        variants = recorded(plan)
+        self.assertEqual(stale_entries(plan, variants), [])
+
+        variants[0] = {**variants[0], "profile": "avif-v0"}
+        variants[2] = {**variants[2], "height": 641}
+        del variants[-1]
+        self.assertEqual(
+            [entry["key"] for entry in stale_entries(plan, variants)],
+            [plan[0]["key"], plan[2]["key"], plan[-1]["key"]],
+        )
+
+    def test_variants_without_a_profile_count_as_v1(self):
+        plan = variant_plan(PREFIX, 1200, 800)
+        legacy = [{key: value for key, value in variant.items() if key != "profile"} for variant in recorded(plan)]
+        self.assertEqual(stale_entries(plan, legacy), [])
+
+    def test_infers_the_upright_size_from_the_display_orientation(self):
+        source = {"key": f"{PREFIX}/source.jpg", "width": 3000, "height": 2000}
+        self.assertEqual(display_size({"width": 1600, "height": 2400, "source": source}), (2000, 3000))
+        self.assertEqual(display_size({"width": 2400, "height": 1600, "source": source}), (3000, 2000))
+        square = {**source, "width": 2000, "height": 2000}
+        self.assertEqual(display_size({"width": 2000, "height": 2000, "source": square}), (2000, 2000))
+
+    def test_merges_fresh_variants_in_plan_order_and_drops_obsolete_ones(self):
+        plan = variant_plan(PREFIX, 1200, 800)
+        kept = recorded(plan)
+        fresh = {**plan[1], "bytes": 99}
+        media = {"width": 1000, "height": 600, "variants": [*reversed(kept), {"key": f"{PREFIX}/320w.webp"}]}
+        job = MediaJob(Path("x.json"), {}, media, plan, stale=[plan[1]], encoded=[fresh])
+        apply_job(job)
+        self.assertEqual([variant["key"] for variant in media["variants"]], [entry["key"] for entry in plan])
+        self.assertEqual(media["variants"][1], fresh)
+        self.assertEqual(media["variants"][0], kept[0])
+        self.assertEqual((media["width"], media["height"]), (1200, 800))
+        self.assertNotIn("crops", media)
+
+    def test_plans_crops_only_where_the_list_page_uses_them(self):
+        self.assertEqual(crop_entries(PREFIX, (1600, 1200), (1600, 1200)), [])
+        self.assertEqual(
+            [entry["key"].rsplit("/", 1)[1] for entry in crop_entries(PREFIX, (1200, 4800), (600, 2400))],
+            ["crop-4x5-640w.avif", "crop-4x5-640w.webp", "crop-4x5-960w.avif", "crop-4x5-960w.webp"],
+        )
+
+    def test_drops_crops_the_shape_no_longer_needs(self):
+        plan = variant_plan(PREFIX, 1200, 800)
+        media = {"width": 1200, "height": 800, "variants": recorded(plan), "crops": [{"aspect": "1:1"}]}
+        apply_job(MediaJob(Path("x.json"), {}, media, plan, stale=[], crops=[]))
+        self.assertNotIn("crops", media)
+
+
+if __name__ == "__main__":
+    unittest.main()
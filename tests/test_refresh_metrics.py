@@ -0,0 +1,101 @@
+import io
+import sys
+import unittest
+from contextlib import redirect_stderr
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import refresh_metrics  # noqa: E402
+from refresh_metrics import TokenBucket, due_artworks, merged_metrics, pixiv_metrics, x_metrics  # noqa: E402
+
+
+class Result(dict):
+    __getattr__ = dict.__getitem__
+
+
+class FlakyPixiv:
+    def __init__(self):
+        self.details: list[int] = []
+
+    def user_illusts(self, user_id: int) -> dict:
+        raise ConnectionError("author list unavailable")
+
+    def illust_detail(self, illust_id: int) -> Result:
+        self.details.append(illust_id)
+        if illust_id == 2:
+            raise ConnectionError("reset by peer")
+        return Result(illust=Result(total_view=illust_id * 10, total_bookmarks=illust_id))
+
+
+class RefreshMetricsTest(unittest.TestCase):
+    def test_recent_works_are_always_due_and_come_first(self):
+        now = datetime(2026, 10, 19, tzinfo=timezone.utc)
+        artworks = [
+            (Path(f"pixiv-{index}.json"), {"id": f"pixiv-{index}", "collected_at": collected})
+            for index, collected in enumerate(["2026-10-01T00:00:00Z", "2026-10-18T00:00:00Z", "2020-01-01T00:00:00Z"])
+        ]
+        due = due_artworks(artworks, now, recent_days=30, rotation=1)
+        self.assertEqual([artwork["id"] for _, artwork in due], ["pixiv-1", "pixiv-0", "pixiv-2"])
+
+        old = [(Path(f"x-{index}.json"), {"id": f"x-{index}", "collected_at": "2020-01-01T00:00:00Z"}) for index in range(70)]
+        week = [len(due_artworks(old, now.replace(day=day), recent_days=30, rotation=7)) for day in range(12, 19)]
+        self.assertEqual(sum(week), len(old))
+
+    def test_only_changed_numbers_are_written(self):
+        self.assertIsNone(merged_metrics({"views": 10, "bookmarks": 2}, 10, 2, 0.0))
+        self.assertEqual(merged_metrics({"views": 10, "bookmarks": 2}, 11, 2, 0.0), {"views": 11, "bookmarks": 2})
+        self.assertIsNone(merged_metrics({"views": 1000, "bookmarks": 200}, 1005, 200, 0.01))
+        self.assertEqual(merged_metrics(None, 5, None, 0.5), {"views": 5})
+
+    def test_one_failed_request_keeps_the_counts_already_fetched(self):
+        api = FlakyPixiv()
+        artworks = [{"source": {"id": str(index)}, "author": {"id": "7"}} for index in (1, 2, 3)]
+        bucket = TokenBucket(rate=1000, capacity=1000)
+        with mock.patch("ingest.pixiv_api", return_value=api), redirect_stderr(io.StringIO()):
+            found = pixiv_metrics(artworks, bucket, max_author_pages=3)
+        self.assertEqual(found, {"1": (10, 1), "3": (30, 3)})
+        self.assertEqual(api.details, [1, 2, 3])
+
+    def test_one_failed_x_batch_keeps_the_other_batches(self):
+        import requests
+
+        def get(url: str, headers: dict, params: dict, timeout: tuple) -> mock.Mock:
+            ids = params["ids"].split(",")
+            response = mock.Mock()
+            if ids[0] == "2":
+                response.raise_for_status.side_effect = requests.HTTPError("503 Service Unavailable")
+            response.json.return_value = {
+                "data": [{"id": status_id, "public_metrics": {"impression_count": 5, "bookmark_count": 1}} for status_id in ids]
+            }
+            return response
+
+        artworks = [{"source": {"id": str(index)}} for index in (1, 2, 3)]
+        bucket = TokenBucket(rate=1000, capacity=1000)
+        with (
+            mock.patch.object(refresh_metrics, "X_LOOKUP_BATCH", 1),
+            mock.patch.dict("os.environ", {"X_BEARER_TOKEN": "token"}),
+            mock.patch("requests.get", side_effect=get),
+            redirect_stderr(io.StringIO()),
+        ):
+            found = x_metrics(artworks, bucket)
+        self.assertEqual(found, {"1": (5, 1), "3": (5, 1)})
+
+    def test_token_bucket_waits_once_burst_is_spent(self):
+        now = [0.0]
+        waits: list[float] = []
+
+        def sleep(seconds: float) -> None:
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(waits, [0.5, 0.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
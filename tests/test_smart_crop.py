@@ -0,0 +1,44 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from smart_crop import crop_boxes  # noqa: E402
+
+
+class SmartCropTest(unittest.TestCase):
+    def detailed(self, size: tuple[int, int]):
+        from PIL import Image, ImageDraw
+
+        patch = Image.new("RGB", size, "white")
+        draw = ImageDraw.Draw(patch)
+        for offset in range(0, max(size), 6):
+            draw.line((offset, 0, 0, offset), fill=(200, 30, 60), width=2)
+        return patch
+
+    def test_frames_the_detailed_part_of_a_tall_page(self):
+        from PIL import Image
+
+        page = Image.new("RGB", (400, 1600), (240, 240, 236))
+        page.paste(self.detailed((400, 300)), (0, 1200))
+        (left, top, right, bottom), square = crop_boxes(page, ((4, 5), (1, 1)))
+        self.assertEqual((left, right, bottom - top), (0, 400, 500))
+        self.assertLessEqual(top, 1200)
+        self.assertGreaterEqual(bottom, 1500)
+        self.assertEqual(square[3] - square[1], 400)
+
+    def test_frames_the_subject_of_a_panorama_and_keeps_fitting_images_whole(self):
+        from PIL import Image
+
+        panorama = Image.new("RGB", (1800, 500), (20, 20, 24))
+        panorama.paste(self.detailed((400, 500)), (100, 0))
+        (left, top, right, bottom), = crop_boxes(panorama, ((1, 1),))
+        self.assertEqual((top, bottom, right - left), (0, 500, 500))
+        self.assertLessEqual(left, 100)
+        self.assertGreaterEqual(right, 500)
+        self.assertEqual(crop_boxes(Image.new("RGB", (800, 1000)), ((4, 5),)), [(0, 0, 800, 1000)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from storage import LocalStorage, MirrorStorage, Storage, storage_from_spec  # noqa: E402
+
+
+class FlakyStorage(LocalStorage):
+    def __init__(self, root: Path, failures: int):
+        super().__init__(root)
+        self.failures = failures
+
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise OSError("temporarily unavailable")
+        super().write(key, payload, content_type)
+
+
+class SlowStorage(LocalStorage):
+    """Counts how many writes are in flight across all instances."""
+
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def write(self, key: str, payload: bytes, content_type: str) -> None:
+        with SlowStorage.lock:
+            SlowStorage.in_flight += 1
+            SlowStorage.peak = max(SlowStorage.peak, SlowStorage.in_flight)
+        time.sleep(0.05)
+        super().write(key, payload, content_type)
+        with SlowStorage.lock:
+            SlowStorage.in_flight -= 1
+
+
+class StorageTest(unittest.TestCase):
+    def test_local_storage_round_trips_and_rejects_unsafe_keys(self):
+        with TemporaryDirectory() as root:
+            storage = LocalStorage(Path(root))
+            storage.write("media/x/1/source.png", b"0123456789", "image/png")
+            self.assertEqual(storage.head("media/x/1/source.png")["bytes"], 10)
+            self.assertEqual(storage.get_range("media/x/1/source.png", 2, 4), b"234")
+            storage.delete_objects(["media/x/1/source.png", "media/x/1/missing.png"])
+            self.assertIsNone(storage.head("media/x/1/source.png"))
+            with self.assertRaises(ValueError):
+                storage.path("../outside")
+
+    def test_mirror_fills_every_backend_and_retries_each_on_its_own(self):
+        with TemporaryDirectory() as first, TemporaryDirectory() as second:
+            primary = LocalStorage(Path(first))
+            mirror = FlakyStorage(Path(second), failures=1)
+            primary.write("media/a.webp", b"old", "image/webp")
+            storage = MirrorStorage(primary, [mirror], backoff=0)
+            storage.put_object("media/a.webp", b"new", "image/webp")
+            self.assertEqual(primary.get_object("media/a.webp"), b"old")
+            self.assertEqual(mirror.get_object("media/a.webp"), b"new")
+
+            storage.force = True
+            self.assertTrue(mirror.force)
+            storage.put_object("media/a.webp", b"newer", "image/webp")
+            self.assertEqual(primary.get_object("media/a.webp"), b"newer")
+
+            mirror.failures = 5
+            with self.assertRaises(RuntimeError):
+                storage.put_object("media/b.webp", b"b", "image/webp")
+
+    def test_incomplete_backends_fail_when_created(self):
+        class WriteOnly(Storage):
+            def write(self, key: str, payload: bytes, content_type: str) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            WriteOnly()
+
+    def test_concurrent_callers_write_in_parallel(self):
+        with TemporaryDirectory() as first, TemporaryDirectory() as second:
+            storage = MirrorStorage(SlowStorage(Path(first)), [SlowStorage(Path(second))], backoff=0)
+            with ThreadPoolExecutor(max_workers=8) as callers:
+                list(callers.map(lambda index: storage.put_object(f"media/{index}.webp", b"x", "image/webp"), range(8)))
+            self.assertGreaterEqual(SlowStorage.peak, 8)
+            self.assertEqual(len(list(Path(second).glob("media/*.webp"))), 8)
+
+    def test_failed_local_write_leaves_no_temporary_file(self):
+        with TemporaryDirectory() as root:
+            storage = LocalStorage(Path(root))
+            with mock.patch("storage.os.replace", side_effect=OSError("disk full")), self.assertRaises(OSError):
+                storage.write("media/a.webp", b"payload", "image/webp")
+            self.assertEqual(list(Path(root, "media").iterdir()), [])
+
+    def test_rejects_unknown_specs(self):
+        with self.assertRaises(ValueError):
+            storage_from_spec("ftp:example")
+
+
+if __name__ == "__main__":
+    unittest.main()
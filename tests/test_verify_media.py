@@ -0,0 +1,62 @@
+import hashlib
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import verify_media  # noqa: E402
+from storage import LocalStorage  # noqa: E402
+
+
+def artwork(source: bytes) -> dict:
+    return {
+        "schema_version": 2,
+        "id": "other-sample",
+        "media": [
+            {
+                "index": 1,
+                "content_hash": f"sha256:{hashlib.sha256(source).hexdigest()}",
+                "source": {"key": "media/other/sample/1/source.png", "bytes": len(source)},
+                "variants": [
+                    {"key": "media/other/sample/1/original.avif", "format": "avif", "bytes": 3},
+                    {"key": "media/other/sample/1/original.webp", "format": "webp", "bytes": 4},
+                ],
+            }
+        ],
+    }
+
+
+class VerifyMediaTest(unittest.TestCase):
+    def test_reports_missing_resized_and_corrupted_objects(self):
+        source = bytes(range(256)) * 40
+        with TemporaryDirectory() as root:
+            storage = LocalStorage(Path(root))
+            storage.write("media/other/sample/1/source.png", source, "image/png")
+            storage.write("media/other/sample/1/original.avif", b"abc", "image/avif")
+            # 小分段，让校验真正走多段并行读取。
+            with mock.patch.object(verify_media, "RANGE_BYTES", 1000):
+                checked, issues = verify_media.verify(storage, [(Path("x.json"), artwork(source))], 4, True)
+                self.assertEqual(checked, 3)
+                self.assertEqual([(issue.key.rsplit("/", 1)[1], issue.problem) for issue in issues], [
+                    ("original.webp", "missing"),
+                ])
+
+                storage.write("media/other/sample/1/original.webp", b"abcde", "image/webp")
+                corrupted = bytearray(source)
+                corrupted[5000] ^= 1
+                storage.write("media/other/sample/1/source.png", bytes(corrupted), "image/png")
+                _, issues = verify_media.verify(storage, [(Path("x.json"), artwork(source))], 4, True)
+                self.assertEqual(sorted(issue.problem for issue in issues), ["hash-mismatch", "size-mismatch"])
+
+    def test_prefers_the_archive_hash_after_a_lossless_repack(self):
+        metadata = artwork(b"downloaded")
+        metadata["media"][0]["source"]["content_hash"] = "sha256:" + "0" * 64
+        source = verify_media.expected_objects(metadata)[0]
+        self.assertEqual(source.content_hash, "sha256:" + "0" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()